@@ -6,19 +6,29 @@ import os
 import hashlib
 import requests
 import urllib3
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
 
 # Configuración
 from config import config
 from quinielasapp.models import database
-from quinielasapp.models.models import User, League, LeagueMembership, Pick, GameResult, SystemConfig, WinnersHistory
+from quinielasapp.models.models import User, League, LeagueMembership, Pick, SystemConfig, WinnersHistory, normalize_selection
 from quinielasapp.services.database_service import (
-    get_current_week, set_current_week, get_system_config,
-    generate_league_code, join_league_by_code, get_user_leagues,
-    get_user_standings_by_league, check_picks_deadline
+    set_current_week, get_system_config,
+    generate_league_code, join_league_by_code, get_leagues_for_user,
+    get_user_standings_by_league
 )
-from shared_utils import get_espn_nfl_data, get_mock_nfl_data, hash_password
+from quinielasapp.services.request_context import (
+    current_user, current_user_leagues, current_league as request_league,
+    current_league_id as request_league_id, current_week as request_week,
+    picks_locked as request_picks_locked, forget as forget_request_context
+)
+from quinielasapp.services.scoring_service import (
+    apply_user_picks, get_pick_masks, get_results_masks, count_mask_results,
+    get_season_leaderboard, get_standings_as_of, get_overall_standings, start_result_listener
+)
+from shared_utils import get_espn_nfl_data, get_mock_nfl_data, hash_password, start_season_prefetch
+from quinielasapp.services.scoreboard_poller import start_scoreboard_poller
 
 # Blueprints
 from blueprints.admin_routes import admin_bp
@@ -38,98 +48,62 @@ app.register_blueprint(admin_bp)
 
 # Inicializar conexión a base de datos
 def initialize_database():
-    """Inicializar conexión a base de datos"""
+    """Verifica la conexión a base de datos y deja la primera conexión en el pool"""
     try:
-        if database.is_closed():
-            database.connect()
+        with database.connection_context():
+            database.execute_sql('SELECT 1')
         print("✅ Conectado a PostgreSQL con Peewee")
     except Exception as e:
         print(f"❌ Error conectando a base de datos: {e}")
 
 @app.before_request
 def before_request():
-    """Asegurar conexión antes de cada request"""
-    if database.is_closed():
-        database.connect()
+    """Tomar una conexión del pool para el request"""
+    database.connect(reuse_if_open=True)
 
 @app.teardown_appcontext
 def close_database_connection(exception):
-    """Cerrar conexión a base de datos después de cada request"""
+    """Regresar la conexión al pool al terminar el request (no cierra el socket)"""
     if not database.is_closed():
         database.close()
 
 # Inicializar la base de datos al importar el módulo
 initialize_database()
 
+# Los juegos que el scoreboard marca como finales se califican solos
+start_result_listener()
+
+# Poller del scoreboard: las rutas leen la semana actual del caché sin esperar a ESPN
+start_scoreboard_poller()
+
+# Precargar en segundo plano las semanas con juegos pendientes (consultas de admin sin esperar a ESPN)
+start_season_prefetch()
+
 # =============================================================================
 # FUNCIONES HELPER MIGRADAS A shared_utils.py
 # =============================================================================
 
-def get_user_standings():
+def get_user_standings(league_id=None, season=None, after=None):
     """
-    Obtiene el ranking general de usuarios (para admin) usando Peewee.
+    Obtiene el ranking general de usuarios (para admin) en una sola consulta agrupada.
+    Regresa (standings, cursor de la siguiente página o None).
     """
     try:
-        from peewee import fn
-        
-        # Obtener todos los usuarios no-admin
-        users = User.select().where(User.is_admin == False)
-        standings_data = []
-        
-        for user in users:
-            # Contar picks totales y correctos
-            total_picks = Pick.select().where(Pick.user == user).count()
-            
-            if total_picks == 0:
-                continue
-                
-            # Contar picks correctos manejando tanto strings como diccionarios
-            correct_picks = 0
-            user_picks = Pick.select(Pick, GameResult).join(
-                GameResult, 
-                on=((Pick.game_id == GameResult.game_id) & (Pick.week == GameResult.week)),
-                join_type='INNER'
-            ).where(Pick.user == user)
-            
-            for pick in user_picks:
-                # Manejar pick.selection como string o diccionario
-                if hasattr(pick, 'gameresult'):
-                    try:
-                        if isinstance(pick.selection, dict):
-                            pick_value = pick.selection.get('abbreviation', pick.selection.get('name', ''))
-                        else:
-                            pick_value = str(pick.selection)
-                        
-                        if pick_value == pick.gameresult.winner:
-                            correct_picks += 1
-                    except Exception as pick_error:
-                        print(f"Error processing pick for user {user.username}: {pick_error}")
-                        continue
-            
-            percentage = (correct_picks / total_picks * 100) if total_picks > 0 else 0
-            
-            standings_data.append({
-                'username': user.username,
-                'nombre': user.first_name or '',
-                'apellido': user.last_name or '',
-                'total_score': correct_picks,
-                'correct_picks': correct_picks,
-                'total_picks': total_picks,
-                'percentage': percentage,
-                'score': correct_picks,  # Para compatibilidad con template
-                'first_name': user.first_name,
-                'last_name': user.last_name
-            })
-        
-        # Ordenar por score descendente
-        standings_data.sort(key=lambda x: x['total_score'], reverse=True)
-        return standings_data
+        return get_overall_standings(league_id=league_id, season=season, after=after)
         
     except Exception as e:
         import traceback
         print(f"Error getting standings: {e}")
         print(f"Traceback: {traceback.format_exc()}")
-        return []
+        return [], None
+
+def parse_standings_cursor(value):
+    """Cursor 'aciertos:user_id' de la paginación de standings; None si no es válido"""
+    try:
+        score, user_id = value.split(':')
+        return int(score), int(user_id)
+    except (AttributeError, ValueError):
+        return None
 
 # =============================================================================
 # RUTAS DE LA APLICACIÓN (MIGRANDO GRADUALMENTE)
@@ -142,39 +116,27 @@ def home():
         return redirect(url_for('login'))
     
     try:
-        # Obtener usuario usando Peewee
-        user = User.get_by_id(session['user_id'])
+        # Usuario, ligas, liga actual y semana desde el contexto del request (una consulta cada uno)
+        user = current_user()
+        if user is None:
+            raise User.DoesNotExist
         
         # Si es admin, redirigir directamente al panel de administración
         if user.is_admin:
             return redirect(url_for('admin.dashboard'))
         
         # Obtener ligas del usuario
-        user_leagues = get_user_leagues(session['user_id'])
+        user_leagues = current_user_leagues()
         
         if not user_leagues:
             # Usuario sin ligas - redirigir a página para unirse
             return redirect(url_for('join_league_route'))
         
-        # Seleccionar liga actual
-        current_league_id = session.get('current_league_id')
-        
-        if current_league_id:
-            try:
-                current_league = League.get_by_id(current_league_id)
-                if current_league not in user_leagues and not user.is_admin:
-                    # Liga no válida para el usuario
-                    current_league = user_leagues[0] if user_leagues else None
-                    session['current_league_id'] = current_league.id if current_league else None
-            except League.DoesNotExist:
-                current_league = user_leagues[0] if user_leagues else None
-                session['current_league_id'] = current_league.id if current_league else None
-        else:
-            current_league = user_leagues[0] if user_leagues else None
-            session['current_league_id'] = current_league.id if current_league else None
+        # Liga actual validada contra las ligas del usuario (cae a la primera si no es válida)
+        current_league = request_league()
         
         # Obtener datos de juegos
-        current_week = get_current_week()
+        current_week = request_week()
         games = get_espn_nfl_data(current_week)
         
         # Obtener picks del usuario para la semana actual
@@ -187,45 +149,19 @@ def home():
                 (Pick.league_id == current_league.id) & 
                 (Pick.week == current_week)
             )
-            user_picks = {pick.game_id: pick.selection for pick in picks}
+            user_picks = {pick.game_id: pick.selection_abbr for pick in picks}
             
-            # Calcular estadísticas de picks
-            results = GameResult.select().where(GameResult.week == current_week)
-            results_dict = {result.game_id: result for result in results}
-            
-            for pick in picks:
-                picks_stats['total'] += 1
-                
-                if pick.game_id in results_dict:
-                    result = results_dict[pick.game_id]
-                    
-                    # Procesar pick.selection para manejar diferentes formatos
-                    picked_team_data = None
-                    if isinstance(pick.selection, dict):
-                        picked_team_data = pick.selection
-                    elif isinstance(pick.selection, str):
-                        try:
-                            import json
-                            if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                                json_string = pick.selection.replace("'", '"')
-                                picked_team_data = json.loads(json_string)
-                            else:
-                                picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                        except (json.JSONDecodeError, ValueError):
-                            picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                    else:
-                        selection_str = str(pick.selection)
-                        picked_team_data = {'name': selection_str, 'abbreviation': selection_str}
-                    
-                    picked_team_abbr = picked_team_data.get('abbreviation', '')
-                    picked_team_name = picked_team_data.get('name', '')
-                    
-                    if picked_team_abbr == result.winner or picked_team_name == result.winner:
-                        picks_stats['correct'] += 1
-                    else:
-                        picks_stats['incorrect'] += 1
-                else:
-                    picks_stats['pending'] += 1
+            # Estadísticas de picks desde weekly_scores (sin recorrer picks): total y aciertos
+            # coinciden con la clasificación; los fallos salen de las máscaras de bits
+            total, correct, picked_mask, home_mask = get_pick_masks(current_week, user.id).get(
+                current_league.id, (0, 0, 0, 0))
+            _, incorrect, _ = count_mask_results(picked_mask, home_mask, get_results_masks(current_week))
+            picks_stats = {
+                'total': total,
+                'correct': correct,
+                'incorrect': incorrect,
+                'pending': max(total - correct - incorrect, 0)
+            }
         
         # Obtener standings de la liga actual
         standings = []
@@ -264,15 +200,10 @@ def home():
         user_has_submitted_picks = False
         if current_league:
             total_games = len(games)
-            user_picks_count = Pick.select().where(
-                (Pick.user == user) & 
-                (Pick.league_id == current_league.id) & 
-                (Pick.week == current_week)
-            ).count()
-            user_has_submitted_picks = (user_picks_count >= total_games)
+            user_has_submitted_picks = total_games > 0 and picks_stats['total'] >= total_games
         
         # Verificar si los picks están bloqueados
-        picks_locked = check_picks_deadline()
+        picks_locked = request_picks_locked()
         
         return render_template('index.html',
                              games=games,
@@ -323,7 +254,7 @@ def login():
                 # Si es admin, no necesita liga
                 if not user.is_admin:
                     # Obtener ligas del usuario para establecer la actual
-                    user_leagues = get_user_leagues(user.id)
+                    user_leagues = get_leagues_for_user(user)
                     if user_leagues:
                         session['current_league_id'] = user_leagues[0].id
                 
@@ -438,21 +369,18 @@ def switch_league():
         if not league_id:
             return jsonify({'success': False, 'message': 'Liga no especificada'}), 400
         
-        user = User.get_by_id(session['user_id'])
+        user = current_user()
+        if user is None:
+            return jsonify({'success': False, 'message': 'No estás logueado'}), 401
         
         # Verificar si el usuario pertenece a esta liga o es admin
         if not user.is_admin:
-            membership = LeagueMembership.select().where(
-                (LeagueMembership.user == user) & 
-                (LeagueMembership.league_id == league_id) & 
-                (LeagueMembership.is_active == True)
-            ).first()
-            
-            if not membership:
+            if not any(league.id == int(league_id) for league in current_user_leagues()):
                 return jsonify({'success': False, 'message': 'No perteneces a esta liga'}), 403
         
         # Cambiar liga actual en la sesión
         session['current_league_id'] = int(league_id)
+        forget_request_context('league')
         
         return jsonify({'success': True, 'message': 'Liga cambiada exitosamente'})
         
@@ -467,25 +395,18 @@ def picks_form():
         return redirect(url_for('login'))
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_week = get_current_week()
+        user = current_user()
+        current_week = request_week()
         
         # Obtener liga actual
-        current_league_id = session.get('current_league_id')
-        if not current_league_id:
-            user_leagues = get_user_leagues(user.id)
-            if user_leagues:
-                current_league_id = user_leagues[0].id
-                session['current_league_id'] = current_league_id
-            else:
-                flash('Debes unirte a una liga primero', 'error')
-                return redirect(url_for('home'))
-        
-        current_league = League.get_by_id(current_league_id)
+        current_league = request_league()
+        if current_league is None:
+            flash('Debes unirte a una liga primero', 'error')
+            return redirect(url_for('home'))
         
         if request.method == 'POST':
             # Verificar si los picks están bloqueados
-            if check_picks_deadline():
+            if request_picks_locked():
                 flash('Los picks están bloqueados para esta semana', 'error')
                 return redirect(url_for('picks_form'))
             
@@ -496,6 +417,10 @@ def picks_form():
             for key, selection in games_data.items():
                 if key.startswith('game_') and selection:
                     game_id = key.replace('game_', '')
+                    # Guardar siempre la abreviatura canónica
+                    selection = normalize_selection(selection)
+                    if not selection:
+                        continue
                     
                     # Usar get_or_create para actualizar picks existentes con transacción
                     with database.atomic():
@@ -514,6 +439,10 @@ def picks_form():
                     
                     picks_saved += 1
             
+            # Calificar picks con resultado y actualizar la puntuación semanal del usuario en esta liga
+            if picks_saved:
+                apply_user_picks(current_week, current_league.id, user.id)
+            
             flash(f'Se guardaron {picks_saved} picks para la semana {current_week}', 'success')
             return redirect(url_for('home'))
         
@@ -526,10 +455,10 @@ def picks_form():
             (Pick.league_id == current_league.id) &
             (Pick.week == current_week)
         )
-        user_picks = {pick.game_id: pick.selection for pick in current_picks}
+        user_picks = {pick.game_id: pick.selection_abbr for pick in current_picks}
         
         # Verificar si los picks están bloqueados
-        picks_locked = check_picks_deadline()
+        picks_locked = request_picks_locked()
         
         return render_template('picks_form.html',
                              games=games,
@@ -545,20 +474,41 @@ def picks_form():
 
 @app.route('/standings')
 def standings():
-    """Página de standings usando Peewee"""
+    """
+    Página de standings usando Peewee.
+    ?as_of_week=N muestra el acumulado de la liga actual hasta la semana N.
+    """
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_league_id = session.get('current_league_id')
+        user = current_user()
+        current_league_id = request_league_id()
+        as_of_week = request.args.get('as_of_week', type=int)
         
         if not current_league_id and not user.is_admin:
             return render_template('standings_partial.html', standings=[])
         
-        if user.is_admin:
-            # Admin ve standings generales
-            standings = get_user_standings()
+        if as_of_week and current_league_id:
+            # Acumulado de la temporada hasta la semana indicada (cumulative_scores)
+            standings = get_standings_as_of(as_of_week, current_league_id)
+        elif user.is_admin:
+            # Admin ve standings generales, paginados por keyset (?after=aciertos:user_id)
+            league_id = request.args.get('league_id', type=int)
+            season = request.args.get('season', type=int)
+            shown = request.args.get('shown', 0, type=int)
+            standings, next_cursor = get_user_standings(
+                league_id=league_id, season=season,
+                after=parse_standings_cursor(request.args.get('after'))
+            )
+            next_url = None
+            if next_cursor:
+                next_url = url_for('standings', league_id=league_id, season=season,
+                                   after=f'{next_cursor[0]}:{next_cursor[1]}',
+                                   shown=shown + len(standings))
+            first_url = url_for('standings', league_id=league_id, season=season) if shown else None
+            return render_template('standings_partial.html', standings=standings,
+                                   rank_offset=shown, next_url=next_url, first_url=first_url)
         else:
             # Usuario ve standings de su liga
             standings = get_user_standings_by_league(current_league_id)
@@ -569,6 +519,24 @@ def standings():
         print(f"Error in standings: {e}")
         return render_template('standings_partial.html', standings=[])
 
+@app.route('/season_leaderboard')
+def season_leaderboard():
+    """Clasificación acumulada de la temporada de la liga actual (HTMX, sin polling)"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    try:
+        current_league_id = request_league_id()
+        if not current_league_id:
+            return render_template('season_leaderboard_partial.html', leaderboard=[])
+        
+        leaderboard = get_season_leaderboard(current_league_id)
+        return render_template('season_leaderboard_partial.html', leaderboard=leaderboard)
+        
+    except Exception as e:
+        print(f"Error in season_leaderboard: {e}")
+        return render_template('season_leaderboard_partial.html', leaderboard=[])
+
 @app.route('/picks_grid')
 def picks_grid():
     """Grid de picks de todos los usuarios"""
@@ -576,9 +544,9 @@ def picks_grid():
         return redirect(url_for('login'))
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_week = get_current_week()
-        current_league_id = session.get('current_league_id')
+        user = current_user()
+        current_week = request_week()
+        current_league_id = request_league_id()
         
         if not current_league_id and not user.is_admin:
             return render_template('picks_grid.html', users=[], games=[], picks_matrix={})
@@ -593,7 +561,7 @@ def picks_grid():
             picks = Pick.select().where(Pick.week == current_week)
         else:
             # Liga específica
-            league = League.get_by_id(current_league_id)
+            league = request_league()
             # Usar la consulta directamente en lugar de la propiedad
             users = User.select().join(LeagueMembership).where(
                 (LeagueMembership.league_id == league.id) & 
@@ -607,65 +575,19 @@ def picks_grid():
         # Crear matriz de picks
         picks_matrix = {}
         for pick in picks:
-            user_id = pick.user.id
+            user_id = pick.user_id
             game_id = pick.game_id
             if user_id not in picks_matrix:
                 picks_matrix[user_id] = {}
             
-            # Procesar pick.selection para manejar diferentes formatos
-            picked_team_data = None
-            
-            if isinstance(pick.selection, dict):
-                picked_team_data = pick.selection
-            elif isinstance(pick.selection, str):
-                # Intentar parsear como JSON si parece un diccionario
-                try:
-                    import json
-                    if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                        # Convertir comillas simples a dobles para JSON válido
-                        json_string = pick.selection.replace("'", '"')
-                        picked_team_data = json.loads(json_string)
-                    else:
-                        # Es solo un string simple (abreviatura o nombre)
-                        picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                except (json.JSONDecodeError, ValueError):
-                    # No es JSON válido, tratar como string simple
-                    picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-            else:
-                # Otros tipos, convertir a string
-                selection_str = str(pick.selection)
-                picked_team_data = {'name': selection_str, 'abbreviation': selection_str}
-            
-            selection_name = picked_team_data.get('name', '')
-            selection_abbr = picked_team_data.get('abbreviation', '')
-            
             picks_matrix[user_id][game_id] = {
                 'selection': {
-                    'name': selection_name,
-                    'abbreviation': selection_abbr
+                    'name': pick.selection_abbr,
+                    'abbreviation': pick.selection_abbr
                 },
-                'is_correct': None  # Se calculará si hay resultados
+                'is_correct': pick.is_correct  # None mientras no hay resultado
             }
         
-        # Obtener resultados de juegos para calcular is_correct
-        results = GameResult.select().where(GameResult.week == current_week)
-        results_dict = {result.game_id: result for result in results}
-        
-        # Calcular is_correct para cada pick
-        for user_id in picks_matrix:
-            for game_id in picks_matrix[user_id]:
-                if game_id in results_dict:
-                    result = results_dict[game_id]
-                    pick_data = picks_matrix[user_id][game_id]
-                    picked_team_abbr = pick_data['selection']['abbreviation']
-                    picked_team_name = pick_data['selection']['name']
-                    
-                    # Comparar con el ganador del resultado
-                    if picked_team_abbr == result.winner or picked_team_name == result.winner:
-                        picks_matrix[user_id][game_id]['is_correct'] = True
-                    else:
-                        picks_matrix[user_id][game_id]['is_correct'] = False
-        
         return render_template('picks_grid.html', 
                              users=users, 
                              games=games, 
@@ -683,9 +605,9 @@ def picks_grid_partial():
         return render_template('picks_grid_partial.html', users=[], games=[], picks_matrix={})
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_week = get_current_week()
-        current_league_id = session.get('current_league_id')
+        user = current_user()
+        current_week = request_week()
+        current_league_id = request_league_id()
         
         if not current_league_id and not user.is_admin:
             return render_template('picks_grid_partial.html', users=[], games=[], picks_matrix={})
@@ -696,7 +618,7 @@ def picks_grid_partial():
             users = User.select().where(User.is_admin == False)
             picks = Pick.select().where(Pick.week == current_week)
         else:
-            league = League.get_by_id(current_league_id)
+            league = request_league()
             # Usar la consulta directamente en lugar de la propiedad
             users = User.select().join(LeagueMembership).where(
                 (LeagueMembership.league_id == league.id) & 
@@ -709,65 +631,19 @@ def picks_grid_partial():
         
         picks_matrix = {}
         for pick in picks:
-            user_id = pick.user.id
+            user_id = pick.user_id
             game_id = pick.game_id
             if user_id not in picks_matrix:
                 picks_matrix[user_id] = {}
             
-            # Procesar pick.selection para manejar diferentes formatos
-            picked_team_data = None
-            
-            if isinstance(pick.selection, dict):
-                picked_team_data = pick.selection
-            elif isinstance(pick.selection, str):
-                # Intentar parsear como JSON si parece un diccionario
-                try:
-                    import json
-                    if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                        # Convertir comillas simples a dobles para JSON válido
-                        json_string = pick.selection.replace("'", '"')
-                        picked_team_data = json.loads(json_string)
-                    else:
-                        # Es solo un string simple (abreviatura o nombre)
-                        picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                except (json.JSONDecodeError, ValueError):
-                    # No es JSON válido, tratar como string simple
-                    picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-            else:
-                # Otros tipos, convertir a string
-                selection_str = str(pick.selection)
-                picked_team_data = {'name': selection_str, 'abbreviation': selection_str}
-            
-            selection_name = picked_team_data.get('name', '')
-            selection_abbr = picked_team_data.get('abbreviation', '')
-            
             picks_matrix[user_id][game_id] = {
                 'selection': {
-                    'name': selection_name,
-                    'abbreviation': selection_abbr
+                    'name': pick.selection_abbr,
+                    'abbreviation': pick.selection_abbr
                 },
-                'is_correct': None  # Se calculará si hay resultados
+                'is_correct': pick.is_correct  # None mientras no hay resultado
             }
         
-        # Obtener resultados de juegos para calcular is_correct
-        results = GameResult.select().where(GameResult.week == current_week)
-        results_dict = {result.game_id: result for result in results}
-        
-        # Calcular is_correct para cada pick
-        for user_id in picks_matrix:
-            for game_id in picks_matrix[user_id]:
-                if game_id in results_dict:
-                    result = results_dict[game_id]
-                    pick_data = picks_matrix[user_id][game_id]
-                    picked_team_abbr = pick_data['selection']['abbreviation']
-                    picked_team_name = pick_data['selection']['name']
-                    
-                    # Comparar con el ganador del resultado
-                    if picked_team_abbr == result.winner or picked_team_name == result.winner:
-                        picks_matrix[user_id][game_id]['is_correct'] = True
-                    else:
-                        picks_matrix[user_id][game_id]['is_correct'] = False
-        
         return render_template('picks_grid_partial.html', 
                              users=users, 
                              games=games, 
@@ -784,29 +660,25 @@ def user_picks_status():
         return redirect(url_for('login'))
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_week = get_current_week()
+        user = current_user()
+        current_week = request_week()
         
-        user_leagues = get_user_leagues(user.id)
+        user_leagues = current_user_leagues()
         leagues_status = []
         
+        # Total de juegos disponibles y picks por liga (una fila de weekly_scores por liga)
+        games = get_espn_nfl_data(current_week)
+        total_games = len(games)
+        pick_masks = get_pick_masks(current_week, user.id)
+        
         for league in user_leagues:
-            # Contar picks del usuario en esta liga para la semana actual
-            picks_count = Pick.select().where(
-                (Pick.user == user) & 
-                (Pick.league_id == league.id) & 
-                (Pick.week == current_week)
-            ).count()
-            
-            # Contar total de juegos disponibles
-            games = get_espn_nfl_data(current_week)
-            total_games = len(games)
+            picks_count, _, _, _ = pick_masks.get(league.id, (0, 0, 0, 0))
             
             leagues_status.append({
                 'league': league,
                 'picks_made': picks_count,
                 'total_games': total_games,
-                'completed': picks_count == total_games
+                'completed': total_games > 0 and picks_count >= total_games
             })
         
         return render_template('user_picks_status.html',
@@ -826,8 +698,8 @@ def my_leagues():
     
     try:
         # Obtener todas las ligas del usuario
-        user_leagues = get_user_leagues(session['user_id'])
-        current_league_id = session.get('current_league_id')
+        user_leagues = current_user_leagues()
+        current_league_id = request_league_id()
         
         # Enriquecer información de ligas con datos adicionales
         enriched_leagues = []
@@ -875,6 +747,7 @@ def join_league_route():
                              message='El código de liga es requerido')
     
     result = join_league_by_code(session['user_id'], league_code)
+    forget_request_context('user_leagues', 'league')
     
     if result['success']:
         return render_template('toast_partial.html', 
@@ -892,22 +765,17 @@ def games_status():
         return redirect(url_for('login'))
     
     try:
-        user = User.get_by_id(session['user_id'])
-        current_week = get_current_week()
+        user = current_user()
+        current_week = request_week()
         games = get_espn_nfl_data(current_week)
         
-        # Obtener resultados si existen
-        results = GameResult.select().where(GameResult.week == current_week)
-        results_dict = {result.game_id: result for result in results}
-        
         # Obtener picks del usuario para esta semana
         user_picks_by_game = {}
         
         # Solo obtener picks si el usuario no es admin
         if not user.is_admin:
-            current_league_id = session.get('current_league_id')
-            if current_league_id:
-                current_league = League.get_by_id(current_league_id)
+            current_league = request_league()
+            if current_league:
                 picks = Pick.select().where(
                     (Pick.user == user) & 
                     (Pick.league_id == current_league.id) & 
@@ -917,97 +785,19 @@ def games_status():
                 for pick in picks:
                     game_id = pick.game_id
                     
-                    # Procesar pick.selection para manejar diferentes formatos
-                    picked_team_data = None
-                    
-                    if isinstance(pick.selection, dict):
-                        picked_team_data = pick.selection
-                    elif isinstance(pick.selection, str):
-                        # Intentar parsear como JSON si parece un diccionario
-                        try:
-                            import json
-                            if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                                # Convertir comillas simples a dobles para JSON válido
-                                json_string = pick.selection.replace("'", '"')
-                                picked_team_data = json.loads(json_string)
-                            else:
-                                # Es solo un string simple (abreviatura o nombre)
-                                picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                        except (json.JSONDecodeError, ValueError):
-                            # No es JSON válido, tratar como string simple
-                            picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                    else:
-                        # Otros tipos, convertir a string
-                        selection_str = str(pick.selection)
-                        picked_team_data = {'name': selection_str, 'abbreviation': selection_str}
-                    
-                    picked_team_name = picked_team_data.get('name', '')
-                    picked_team_abbr = picked_team_data.get('abbreviation', '')
-                    picked_team_for_comparison = picked_team_abbr or picked_team_name
-                    
                     user_picks_by_game[game_id] = {
                         'picked_team': {
-                            'name': picked_team_name,
-                            'abbreviation': picked_team_abbr
+                            'name': pick.selection_abbr,
+                            'abbreviation': pick.selection_abbr
                         },
-                        'result': None  # Se calculará si hay resultado
+                        'result': None if pick.is_correct is None else ('correct' if pick.is_correct else 'incorrect')
                     }
-                    
-                    # Si hay resultado, determinar si el pick fue correcto
-                    if game_id in results_dict:
-                        result = results_dict[game_id]
-                        if picked_team_for_comparison == result.winner:
-                            user_picks_by_game[game_id]['result'] = 'correct'
-                        else:
-                            user_picks_by_game[game_id]['result'] = 'incorrect'
-        
-        # Agregar resultados a los juegos
-        for game in games:
-            game_id = game['id']
-            if game_id in results_dict:
-                result = results_dict[game_id]
-                game['result'] = {
-                    'winner': result.winner,
-                    'home_score': result.home_score,
-                    'away_score': result.away_score
-                }
         
-        # Obtener última actualización
-        from datetime import datetime, timezone, timedelta
-        try:
-            from zoneinfo import ZoneInfo
-            cdmx_tz = ZoneInfo('America/Mexico_City')
-        except ImportError:
-            # Fallback para sistemas sin zoneinfo
-            from datetime import timezone
-            cdmx_tz = timezone(timedelta(hours=-6))  # CDMX es UTC-6
-        
-        # Convertir horarios a CDMX y generar timestamp de última actualización
-        utc_now = datetime.now(timezone.utc)
-        last_update_mex = utc_now.astimezone(cdmx_tz).strftime('%d/%m/%Y %I:%M %p CDMX')
-        
-        # Convertir horarios de juegos a CDMX
-        for game in games:
-            if game.get('date'):
-                try:
-                    # Parsear fecha ISO
-                    game_date = datetime.fromisoformat(game['date'].replace('Z', '+00:00'))
-                    # Convertir a CDMX
-                    game_date_mex = game_date.astimezone(cdmx_tz)
-                    
-                    # Obtener día de la semana en español
-                    dias_semana = {
-                        0: 'Lun', 1: 'Mar', 2: 'Mié', 3: 'Jue', 
-                        4: 'Vie', 5: 'Sáb', 6: 'Dom'
-                    }
-                    dia_semana = dias_semana[game_date_mex.weekday()]
-                    
-                    # Formatear con día, fecha y hora
-                    game['start_time'] = f"{dia_semana} {game_date_mex.strftime('%d/%m')} {game_date_mex.strftime('%I:%M %p')}"
-                except Exception as time_error:
-                    print(f"Error converting time for game {game.get('id', '')}: {time_error}")
-                    # Mantener el valor original si falla la conversión
-                    pass
+        # Timestamp de última actualización en hora de CDMX
+        # (las horas de inicio ya vienen calculadas en cada GameRecord como start_time_short)
+        from datetime import datetime, timezone
+        from quinielasapp.services.games_service import CDMX_TZ
+        last_update_mex = datetime.now(timezone.utc).astimezone(CDMX_TZ).strftime('%d/%m/%Y %I:%M %p CDMX')
         
         # Debug: imprimir user_picks_by_game para verificar formato
         return render_template('games_status_with_picks.html',
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor vectorizado (quinielasapp/services/scoring_engine.py).
+Califica una temporada sintética completa (semanas × usuarios × juegos)
+en una sola llamada y calcula ranking y empates:
+
+    python benchmarks/scoring_engine.py
+    python benchmarks/scoring_engine.py --users 10000 --weeks 18 --games 16 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from quinielasapp.services.scoring_engine import NO_PICK, score_picks, rank_scores, tie_groups
+
+
+def synthetic_season(users, weeks, games, seed=0):
+    """Cada juego enfrenta a los equipos 2g y 2g+1; ~5% de picks vacíos"""
+    rng = np.random.default_rng(seed)
+    home = np.arange(games, dtype=np.int16) * 2
+    picks = home + rng.integers(0, 2, size=(weeks, users, games), dtype=np.int16)
+    picks[rng.random((weeks, users, games)) < 0.05] = NO_PICK
+    results = home + rng.integers(0, 2, size=(weeks, games), dtype=np.int16)
+    return picks, results
+
+
+def rescore(picks, results):
+    weekly_correct, _ = score_picks(picks, results)
+    season_correct = weekly_correct.sum(axis=0)
+    return weekly_correct, season_correct, rank_scores(season_correct), tie_groups(season_correct)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motor vectorizado de puntuación')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--weeks', type=int, default=18)
+    parser.add_argument('--games', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    picks, results = synthetic_season(args.users, args.weeks, args.games)
+
+    # Comprobación contra un cálculo directo en Python para un usuario
+    weekly_correct, season_correct, ranks, groups = rescore(picks, results)
+    user = args.users // 2
+    expected = sum(int(picks[w, user, g] == results[w, g])
+                   for w in range(args.weeks) for g in range(args.games))
+    assert season_correct[user] == expected, 'el motor no coincide con el cálculo directo'
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        rescore(picks, results)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+    print(f"{args.users} usuarios × {args.weeks} semanas × {args.games} juegos "
+          f"({picks.size:,} celdas)")
+    print(f"  temporada calificada + ranking + empates: {elapsed_ms:.1f} ms por llamada")
+    print(f"  líder: {int(season_correct.max())} aciertos, "
+          f"{len(groups[0][1])} usuario(s) empatados en primer lugar")
+
+
+if __name__ == '__main__':
+    main()
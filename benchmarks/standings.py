@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark del ranking por liga (get_user_standings_by_league).
+Compara la versión anterior (un query por usuario) con la lectura de weekly_scores
+y mide también la calificación set-based de la semana (is_correct + weekly_scores), contando queries y latencia
+sobre una base SQLite en memoria:
+
+    python benchmarks/standings.py
+    python benchmarks/standings.py --members 10 100 1000 --games 16 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peewee import SqliteDatabase
+from quinielasapp.models.models import User, League, LeagueMembership, Pick, GameResult, Game, SystemConfig, WeeklyScore, CumulativeScore
+from quinielasapp.services.database_service import get_current_week, get_user_standings_by_league
+from quinielasapp.services import scoring_service
+from quinielasapp.services.scoring_service import apply_game_results
+
+MODELS = [User, League, LeagueMembership, Pick, GameResult, Game, SystemConfig, WeeklyScore, CumulativeScore]
+WEEK = 5
+TEAMS = ['KC', 'BUF', 'PHI', 'DAL', 'SF', 'SEA', 'GB', 'CHI', 'MIA', 'NYJ', 'BAL', 'PIT',
+         'DET', 'MIN', 'LAR', 'ARI', 'DEN', 'LV', 'CIN', 'CLE', 'HOU', 'IND', 'JAX', 'TEN',
+         'ATL', 'CAR', 'NO', 'TB', 'NE', 'NYG', 'WSH', 'LAC']
+
+
+class CountingDatabase(SqliteDatabase):
+    """SQLite en memoria que cuenta las sentencias ejecutadas"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = 0
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        self.queries += 1
+        return super().execute_sql(sql, params, *args, **kwargs)
+
+
+def legacy_standings(league_id):
+    """Versión anterior: tres queries por miembro de la liga"""
+    current_week = get_current_week()
+    users = User.select().join(LeagueMembership).where(
+        (LeagueMembership.league_id == league_id) &
+        (LeagueMembership.is_active == True)
+    )
+
+    standings_data = []
+    for user in users:
+        total_picks = Pick.select().where(
+            (Pick.user == user) & (Pick.league_id == league_id) & (Pick.week == current_week)
+        ).count()
+        if total_picks == 0:
+            continue
+
+        results = GameResult.select().where(GameResult.week == current_week)
+        results_dict = {result.game_id: result for result in results}
+
+        correct_picks = 0
+        for pick in Pick.select().where(
+            (Pick.user == user) & (Pick.league_id == league_id) & (Pick.week == current_week)
+        ):
+            result = results_dict.get(pick.game_id)
+            if result and pick.selection_abbr == result.winner:
+                correct_picks += 1
+
+        standings_data.append({'username': user.username, 'correct_picks': correct_picks,
+                               'total_picks': total_picks})
+
+    standings_data.sort(key=lambda x: x['correct_picks'], reverse=True)
+    return standings_data
+
+
+def seed(members, games):
+    """Una liga con `members` usuarios que eligieron todos los juegos de la semana"""
+    rng = random.Random(members)
+    league = League.create(name='Benchmark', code=f'B{members}', created_by=1)
+    SystemConfig.create(config_key='current_week', config_value=str(WEEK))
+
+    matchups = [(TEAMS[(2 * i) % len(TEAMS)], TEAMS[(2 * i + 1) % len(TEAMS)]) for i in range(games)]
+    GameResult.insert_many([
+        {'week': WEEK, 'game_id': f'g{i}', 'winner': rng.choice(matchup),
+         'home_team': matchup[0], 'away_team': matchup[1]}
+        for i, matchup in enumerate(matchups)
+    ]).execute()
+
+    User.insert_many([
+        {'username': f'user{i}', 'password': 'x', 'first_name': f'Nombre{i}', 'last_name': 'Apellido'}
+        for i in range(members)
+    ]).execute()
+    user_ids = [user.id for user in User.select(User.id)]
+
+    LeagueMembership.insert_many([
+        {'user': user_id, 'league': league.id} for user_id in user_ids
+    ]).execute()
+
+    picks = []
+    for user_id in user_ids:
+        for i, matchup in enumerate(matchups):
+            abbr = rng.choice(matchup)
+            picks.append({'user': user_id, 'league': league.id, 'week': WEEK, 'game_id': f'g{i}',
+                          'selection': abbr, 'selection_abbr': abbr})
+    for start in range(0, len(picks), 500):
+        Pick.insert_many(picks[start:start + 500]).execute()
+
+    return league.id
+
+
+def measure(db, fn, league_id, repeat):
+    """Regresa (queries por llamada, ms promedio, resultado)"""
+    fn(league_id)  # Calentamiento (imports y caché de sentencias)
+    db.queries = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(league_id)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    return db.queries // repeat, elapsed_ms, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del ranking por liga')
+    parser.add_argument('--members', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--games', type=int, default=16, help='Juegos por semana')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'miembros':>9} | {'versión':<9} | {'queries':>7} | {'ms/llamada':>10}")
+    print('-' * 46)
+
+    for members in args.members:
+        db = CountingDatabase(':memory:')
+        scoring_service.database = db  # Transacciones del servicio sobre la base del benchmark
+        with db.bind_ctx(MODELS):
+            db.create_tables(MODELS)
+            league_id = seed(members, args.games)
+
+            legacy_q, legacy_ms, legacy = measure(db, legacy_standings, league_id, args.repeat)
+            game_ids = [f'g{i}' for i in range(args.games)]
+            refresh_q, refresh_ms, _ = measure(db, lambda _: apply_game_results(WEEK, game_ids), league_id, args.repeat)
+            agg_q, agg_ms, aggregated = measure(db, get_user_standings_by_league, league_id, args.repeat)
+
+            # Mismos puntajes por usuario en ambas versiones
+            expected = {row['username']: (row['correct_picks'], row['total_picks']) for row in legacy}
+            actual = {row['username']: (row['correct_picks'], row['total_picks']) for row in aggregated}
+            assert expected == actual, 'weekly_scores no coincide con la versión anterior'
+
+        db.close()
+        print(f"{members:>9} | {'anterior':<9} | {legacy_q:>7} | {legacy_ms:>10.1f}")
+        print(f"{members:>9} | {'recálculo':<9} | {refresh_q:>7} | {refresh_ms:>10.1f}")
+        print(f"{members:>9} | {'weekly':<9} | {agg_q:>7} | {agg_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
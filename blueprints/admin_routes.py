@@ -7,11 +7,18 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from quinielasapp.models.models import User, League, LeagueMembership, Pick, GameResult, SystemConfig
 from quinielasapp.models import database
 from quinielasapp.services.database_service import (
-    get_current_week, set_current_week, get_system_config,
-    generate_league_code, get_user_leagues,
-    get_user_standings_by_league, check_picks_deadline
+    set_current_week, get_system_config,
+    generate_league_code, get_user_leagues
+)
+from quinielasapp.services.request_context import (
+    current_week as request_week, picks_locked as request_picks_locked, forget as forget_request_context
+)
+from quinielasapp.services.scoring_service import (
+    game_result_row, upsert_game_results, revert_game_results, get_weekly_standings, declare_week_winners,
+    get_users_with_picks
 )
 from shared_utils import get_espn_nfl_data
+from quinielasapp.services.scoreboard_poller import wake_scoreboard_poller, get_poller_status
 
 # Crear el blueprint
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -38,37 +45,27 @@ def dashboard():
     try:
         # Obtener estadísticas básicas (excluyendo admins)
         total_users = User.select().where(User.is_admin == False).count()
-        current_week = get_current_week()
-        picks_locked = check_picks_deadline()
+        current_week = request_week()
+        picks_locked = request_picks_locked()
         
-        # Usuarios únicos que han hecho picks esta semana (solo usuarios no-admin)
-        from peewee import fn
-        picks_submitted = (Pick.select(Pick.user)
-                          .join(User)
-                          .where(
-                              (Pick.week == current_week) & 
-                              (User.is_admin == False)
-                          )
-                          .distinct()
-                          .count())
+        # Usuarios con picks esta semana según weekly_scores.total (una consulta)
+        users_with_picks = get_users_with_picks(current_week)
         
         # Obtener todos los usuarios (excluyendo admins) con información adicional
         users = []
         for user in User.select().where(User.is_admin == False):
-            has_picks = Pick.select().where(
-                (Pick.user == user) & 
-                (Pick.week == current_week)
-            ).exists()
-            
             user_data = {
                 'id': user.id,
                 'username': user.username,
                 'is_admin': user.is_admin,
-                'has_picks': has_picks,
+                'has_picks': user.id in users_with_picks,
                 'total_score': 0  # TODO: Implementar cálculo de puntuación
             }
             users.append(user_data)
         
+        # Usuarios únicos que han hecho picks esta semana (solo usuarios no-admin)
+        picks_submitted = sum(1 for user_data in users if user_data['has_picks'])
+        
         # Obtener todas las ligas
         leagues = []
         for league in League.select():
@@ -111,6 +108,8 @@ def update_week():
         week = int(request.form.get('week', 1))
         if 1 <= week <= 18:
             set_current_week(week)
+            forget_request_context('week')
+            wake_scoreboard_poller()
             
             # Obtener estadísticas actualizadas para la nueva semana
             picks_submitted = Pick.select().where(Pick.week == week).count()
@@ -198,11 +197,12 @@ def update_week():
 def toggle_picks_lock():
     """Alternar el estado de bloqueo de picks"""
     try:
-        current_locked = check_picks_deadline()
+        current_locked = request_picks_locked()
         new_state = not current_locked
         
         # Actualizar configuración
         SystemConfig.set_config('picks_locked', '1' if new_state else '0')
+        forget_request_context('picks_locked')
         
         status_text = "bloqueados" if new_state else "desbloqueados"
         return f'''
@@ -421,7 +421,7 @@ def all_memberships():
 def process_results():
     """Procesar resultados de una semana específica"""
     try:
-        week = int(request.form.get('week', get_current_week()))
+        week = int(request.form.get('week', request_week()))
         
         # 1. Obtener resultados de ESPN API
         games = get_espn_nfl_data(week)
@@ -437,10 +437,8 @@ def process_results():
             </div>
             '''
         
-        processed_games = 0
-        updated_games = 0
-        
-        # 2. Procesar cada juego y guardar resultados
+        # 2. Armar los resultados de los juegos terminados
+        results = []
         for game in games:
             game_id = game.get('id') or game.get('game_id')
             status = game.get('status', '').lower()
@@ -457,62 +455,24 @@ def process_results():
                     print(f"Datos incompletos para juego: id={game_id}, home={home_team}, away={away_team}")
                     continue
                 
-                # Determinar ganador
-                if home_score > away_score:
-                    winner = home_team
-                elif away_score > home_score:
-                    winner = away_team
-                else:
-                    winner = 'TIE'  # Empate (raro en NFL pero posible)
+                # Convertir scores a int de forma segura
+                home_score_int = int(home_score) if str(home_score).isdigit() else 0
+                away_score_int = int(away_score) if str(away_score).isdigit() else 0
                 
-                # Guardar o actualizar resultado
-                try:
-                    # Convertir scores a int de forma segura
-                    home_score_int = int(home_score) if str(home_score).isdigit() else 0
-                    away_score_int = int(away_score) if str(away_score).isdigit() else 0
-                    
-                    with database.atomic():
-                        result, created = GameResult.get_or_create(
-                            game_id=game_id,
-                            week=week,
-                            defaults={
-                                'home_team': home_team,
-                                'away_team': away_team,
-                                'home_score': home_score_int,
-                                'away_score': away_score_int,
-                                'winner': winner
-                            }
-                        )
-                    
-                    if not created:
-                        # Actualizar resultado existente solo si cambió algo
-                        needs_update = (
-                            result.home_team != home_team or 
-                            result.away_team != away_team or
-                            result.home_score != home_score_int or 
-                            result.away_score != away_score_int or
-                            result.winner != winner
-                        )
-                        
-                        if needs_update:
-                            with database.atomic():
-                                result.home_team = home_team
-                                result.away_team = away_team
-                                result.home_score = home_score_int
-                                result.away_score = away_score_int
-                                result.winner = winner
-                                result.save()
-                            updated_games += 1
-                            print(f"Actualizado juego {game_id}: {away_team} @ {home_team} ({away_score_int}-{home_score_int})")
-                    else:
-                        processed_games += 1
-                        print(f"Procesado nuevo juego {game_id}: {away_team} @ {home_team} ({away_score_int}-{home_score_int})")
-                        
-                except Exception as e:
-                    print(f"Error processing game {game_id}: {e}")
-                    continue
-        
-        # 3. Calcular estadísticas de procesamiento
+                results.append(game_result_row(game_id, home_team, away_team,
+                                               home_score_int, away_score_int))
+        
+        # 3. Un solo upsert para toda la semana; en la misma transacción se califican
+        #    los picks de los juegos nuevos o cambiados y se recalculan solo sus usuarios
+        inserted, updated = upsert_game_results(week, results)
+        processed_games = len(inserted)
+        updated_games = len(updated)
+        for game_id in inserted:
+            print(f"Procesado nuevo juego {game_id}")
+        for game_id in updated:
+            print(f"Actualizado juego {game_id}")
+        
+        # 4. Calcular estadísticas de procesamiento
         total_completed = processed_games + updated_games
         completed_games_in_api = sum(1 for game in games if game.get('completed', False) or game.get('status', '').lower() in ['final', 'status_final', 'completed'])
         
@@ -575,28 +535,37 @@ def process_results():
         </div>
         '''
 
+@admin_bp.route('/revert_result', methods=['POST'])
+@admin_required
+def revert_result():
+    """Revertir el resultado registrado de un juego (sus picks vuelven a pendientes)"""
+    try:
+        week = int(request.form.get('week', request_week()))
+        game_id = request.form.get('game_id', '').strip()
+        
+        if game_id:
+            deleted = revert_game_results(week, [game_id])
+            print(f"Revertido resultado del juego {game_id} en semana {week} ({deleted} registros)")
+        
+        # Volver a mostrar los juegos de la semana
+        return redirect(url_for('admin.view_week_games', week=week))
+        
+    except ValueError:
+        return render_template('toast_partial.html',
+                             category='error',
+                             message='Semana inválida')
+    except Exception as e:
+        print(f"Error reverting result: {e}")
+        return render_template('toast_partial.html',
+                             category='error',
+                             message='Error al revertir el resultado')
+
 @admin_bp.route('/declare_winner', methods=['POST'])
 @admin_required
 def declare_winner():
     """Declarar ganador de una semana"""
     try:
-        week = int(request.form.get('week', get_current_week()))
-        
-        # Importar WinnersHistory si no está disponible
-        try:
-            from quinielasapp.models.models import WinnersHistory
-        except ImportError:
-            print("Warning: WinnersHistory model not found")
-            return '''
-            <div class="rounded-md p-4 bg-red-50 border border-red-200 text-red-800">
-                <div class="flex">
-                    <div class="ml-3">
-                        <p class="text-sm font-medium">❌ Error: Modelo WinnersHistory no encontrado</p>
-                    </div>
-                </div>
-            </div>
-            '''
-        from peewee import fn
+        week = int(request.form.get('week', request_week()))
         
         # 1. Verificar que hay resultados para esta semana
         results_count = GameResult.select().where(GameResult.week == week).count()
@@ -612,111 +581,14 @@ def declare_winner():
             </div>
             '''
         
-        # 2. Calcular puntuaciones por liga
-        winners_declared = 0
-        leagues_processed = []
+        # 2. Ganadores de todas las ligas en una consulta (función de ventana sobre weekly_scores)
+        # 3. Reemplazar WinnersHistory de esas ligas en una sola transacción
+        leagues_processed = declare_week_winners(week)
+        winners_declared = sum(len(league_info['winners']) for league_info in leagues_processed)
         
-        # Obtener todas las ligas activas que tienen picks para esta semana
-        leagues_with_picks = League.select().join(Pick).where(
-            (Pick.week == week) & 
-            (League.is_active == True)
-        ).distinct()
-        
-        for league in leagues_with_picks:
-            # Calcular puntuaciones para esta liga específica
-            user_scores = {}
-            
-            # Obtener todos los picks de esta liga para la semana
-            try:
-                # Obtener resultados de esta semana
-                results = GameResult.select().where(GameResult.week == week)
-                results_dict = {result.game_id: result for result in results}
-                
-                # Obtener todos los picks de la liga para esta semana
-                picks_query = Pick.select().join(User).where(
-                    (Pick.league_id == league.id) &
-                    (Pick.week == week)
-                )
-                
-                # Procesar cada pick y verificar si es correcto
-                for pick in picks_query:
-                    if pick.game_id in results_dict:
-                        result = results_dict[pick.game_id]
-                        
-                        # Procesar pick.selection para manejar diferentes formatos
-                        picked_team_data = None
-                        if isinstance(pick.selection, dict):
-                            picked_team_data = pick.selection
-                        elif isinstance(pick.selection, str):
-                            try:
-                                import json
-                                if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                                    json_string = pick.selection.replace("'", '"')
-                                    picked_team_data = json.loads(json_string)
-                                else:
-                                    picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                            except (json.JSONDecodeError, ValueError):
-                                picked_team_data = {'name': pick.selection, 'abbreviation': pick.selection}
-                        else:
-                            selection_str = str(pick.selection)
-                            picked_team_data = {'name': selection_str, 'abbreviation': selection_str}
-                        
-                        picked_team_abbr = picked_team_data.get('abbreviation', '')
-                        picked_team_name = picked_team_data.get('name', '')
-                        
-                        # Verificar si el pick es correcto
-                        if picked_team_abbr == result.winner or picked_team_name == result.winner:
-                            user_id = pick.user.id
-                            username = pick.user.username
-                            
-                            if user_id not in user_scores:
-                                user_scores[user_id] = {
-                                    'username': username,
-                                    'user_id': user_id,
-                                    'correct_picks': 0
-                                }
-                            
-                            user_scores[user_id]['correct_picks'] += 1
-                            
-            except Exception as query_error:
-                print(f"Error in picks query for league {league.name}: {query_error}")
-                continue
-            
-            if not user_scores:
-                continue  # No hay picks correctos en esta liga
-            
-            # Encontrar la puntuación máxima
-            max_score = max(score['correct_picks'] for score in user_scores.values())
-            
-            # Encontrar todos los usuarios con la puntuación máxima (pueden ser empates)
-            winners = [data for data in user_scores.values() if data['correct_picks'] == max_score]
-            
-            # 3. Limpiar ganadores existentes para esta liga/semana y crear nuevos
-            with database.atomic():
-                WinnersHistory.delete().where(
-                    (WinnersHistory.league_id == league.id) & 
-                    (WinnersHistory.week == week)
-                ).execute()
-                
-                # Crear entradas de ganadores (uno por ganador en caso de empate)
-                for winner in winners:
-                    WinnersHistory.create(
-                        user_id=winner['user_id'],
-                        league_id=league.id,
-                        week=week,
-                    winner_username=winner['username'],
-                    score=winner['correct_picks'],
-                    is_tie=len(winners) > 1
-                )
-            
-            print(f"Declared winners for league {league.name}: {[w['username'] for w in winners]} with {max_score} points")
-            
-            winners_declared += len(winners)
-            leagues_processed.append({
-                'league_name': league.name,
-                'winners': winners,
-                'max_score': max_score
-            })
+        for league_info in leagues_processed:
+            print(f"Declared winners for league {league_info['league_name']}: "
+                  f"{[w['username'] for w in league_info['winners']]} with {league_info['max_score']} points")
         
         # 4. Preparar mensaje de respuesta
         if winners_declared > 0:
@@ -773,7 +645,7 @@ def declare_winner():
 def view_week_games():
     """Ver juegos de una semana específica"""
     try:
-        week = int(request.args.get('week', get_current_week()))
+        week = int(request.args.get('week', request_week()))
         
         # Obtener juegos de la semana desde ESPN API
         games = get_espn_nfl_data(week)
@@ -1001,7 +873,7 @@ def debug_api(week):
         return jsonify({
             'week': week,
             'espn_games_count': len(games_data),
-            'espn_games': games_data[:3],  # Mostrar solo los primeros 3
+            'espn_games': [game.to_dict() for game in games_data[:3]],  # Mostrar solo los primeros 3
             'mock_games_count': len(mock_data),
             'mock_games': mock_data[:2]   # Mostrar solo los primeros 2
         })
@@ -1009,6 +881,23 @@ def debug_api(week):
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@admin_bp.route('/scoreboard_stats')
+@admin_required
+def scoreboard_stats():
+    """Contadores del caché del scoreboard, estado del poller y salud de ESPN (solo admin)"""
+    try:
+        from quinielasapp.services.scoreboard_cache import scoreboard_cache, scoreboard_flight
+        from quinielasapp.services.espn_client import espn_client
+        from quinielasapp.services.game_events import get_event_stats
+        stats = scoreboard_cache.stats()
+        stats['single_flight'] = scoreboard_flight.stats()
+        stats['events'] = get_event_stats()
+        stats['poller'] = get_poller_status()
+        stats['espn'] = espn_client.stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
 @admin_bp.route('/stats')
 @admin_required
 def stats():
@@ -1071,7 +960,7 @@ def get_leagues_table_html():
 def debug_process_validation():
     """Debug endpoint para validar el procesamiento de resultados"""
     try:
-        week = int(request.args.get('week', get_current_week()))
+        week = int(request.args.get('week', request_week()))
         
         # Obtener juegos de ESPN
         games = get_espn_nfl_data(week)
@@ -1095,8 +984,8 @@ def debug_process_validation():
             
             debug_info['games_details'].append({
                 'game_id': game_id,
-                'home_team': game.get('home_team', {}),
-                'away_team': game.get('away_team', {}),
+                'home_team': dict(game.get('home_team', {})),
+                'away_team': dict(game.get('away_team', {})),
                 'home_score': game.get('home_score'),
                 'away_score': game.get('away_score'),
                 'status': game.get('status'),
@@ -1114,7 +1003,7 @@ def debug_process_validation():
 def debug_winner_validation():
     """Debug endpoint para validar la declaración de ganadores"""
     try:
-        week = int(request.args.get('week', get_current_week()))
+        week = int(request.args.get('week', request_week()))
         
         # Importar modelo necesario
         try:
@@ -1179,28 +1068,9 @@ def admin_view_standings():
         # Obtener todas las ligas activas
         leagues = League.select().where(League.is_active == True)
         
-        all_standings = []
-        
-        for league in leagues:
-            # Obtener standings para esta liga específica
-            try:
-                league_standings = get_user_standings_by_league(league.id)
-                
-                if league_standings:
-                    # Los standings ya vienen ordenados por total_score descendente
-                    # Solo agregar información de la liga a cada entrada
-                    for standing in league_standings:
-                        standing['league_name'] = league.name
-                        standing['league_code'] = league.code
-                    
-                    all_standings.extend(league_standings)
-            except Exception as league_error:
-                print(f"Error getting standings for league {league.name}: {league_error}")
-                continue
-        
-        # Agrupar por league manteniendo el orden interno de cada liga
-        # Solo ordenar por nombre de liga para presentación
-        all_standings.sort(key=lambda x: x.get('league_name', ''))
+        # Una sola lectura de weekly_scores para todas las ligas activas,
+        # agrupadas por nombre de liga y ordenadas por puntuación dentro de cada una
+        all_standings = get_weekly_standings(request_week())
         
         # Crear modal con template personalizado
         return render_template('admin_standings_modal.html', standings=all_standings, leagues=leagues)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita el scoreboard de ESPN usando payloads grabados (fixtures/espn).
+Sirve para probar y medir el caché, la coalescencia y el manejo de fallos sin red.
+
+    python espn_stub.py --port 8765 --state final --week-state 3=in_progress --latency 0.2 --error-rate 0.1
+
+Y en la aplicación:
+
+    ESPN_SCOREBOARD_URL=http://localhost:8765/apis/site/v2/sports/football/nfl/scoreboard
+
+Estados disponibles: pre_game, in_progress, final, malformed.
+El estado de una semana se puede cambiar en caliente con
+GET /__stub/state?week=3&state=final
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'espn')
+SCOREBOARD_PATH = '/apis/site/v2/sports/football/nfl/scoreboard'
+STATES = ('pre_game', 'in_progress', 'final', 'malformed')
+
+
+def load_fixtures():
+    """Carga los payloads grabados; malformed se guarda como texto crudo"""
+    fixtures = {}
+    for state in STATES:
+        with open(os.path.join(FIXTURES_DIR, f'{state}.json'), encoding='utf-8') as f:
+            text = f.read()
+        fixtures[state] = text if state == 'malformed' else json.loads(text)
+    return fixtures
+
+
+def payload_for_week(fixture, season, week):
+    """
+    Adapta un fixture a la semana pedida: IDs de evento únicos por semana
+    y fechas recorridas a la temporada y semana pedidas, como en el calendario real.
+    """
+    data = json.loads(json.dumps(fixture))
+    # Recorrer también a la temporada pedida en semanas completas (conserva el día de la semana)
+    fixture_season = data.get('season', {}).get('year', season)
+    offset = timedelta(weeks=week - 1 + 52 * (season - fixture_season))
+    data['week'] = {'number': week}
+    data['season'] = {'type': 2, 'year': season}
+
+    for index, event in enumerate(data.get('events', [])):
+        event_id = f"{season}{week:02d}{index:02d}"
+        event['id'] = event_id
+        if event.get('date'):
+            kickoff = datetime.strptime(event['date'], '%Y-%m-%dT%H:%MZ') + offset
+            event['date'] = kickoff.strftime('%Y-%m-%dT%H:%MZ')
+        for competition in event.get('competitions', []):
+            competition['id'] = event_id
+            competition['date'] = event.get('date')
+    return data
+
+
+class StubState:
+    """Configuración compartida por los hilos del servidor"""
+
+    def __init__(self, default_state, week_states, latency, jitter, error_rate):
+        self.default_state = default_state
+        self.week_states = dict(week_states)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def state_for(self, week):
+        with self.lock:
+            return self.week_states.get(week, self.default_state)
+
+
+def make_handler(fixtures, stub):
+    class ESPNStubHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='application/json'):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path == '/__stub/state':
+                week = int(params.get('week', ['0'])[0])
+                state = params.get('state', [''])[0]
+                if state not in STATES:
+                    return self._send(400, json.dumps({'error': f'estado inválido: {state}'}))
+                with stub.lock:
+                    if week:
+                        stub.week_states[week] = state
+                    else:
+                        stub.default_state = state
+                return self._send(200, json.dumps({'week': week or 'default', 'state': state}))
+
+            if url.path == '/__stub/stats':
+                with stub.lock:
+                    return self._send(200, json.dumps({'requests': stub.requests}))
+
+            if url.path != SCOREBOARD_PATH:
+                return self._send(404, json.dumps({'error': 'not found'}))
+
+            with stub.lock:
+                stub.requests += 1
+
+            # Latencia configurable con jitter
+            delay = stub.latency + random.uniform(0, stub.jitter)
+            if delay > 0:
+                time.sleep(delay)
+
+            # Inyección de errores
+            if stub.error_rate and random.random() < stub.error_rate:
+                return self._send(503, json.dumps({'error': 'injected failure'}))
+
+            week = int(params.get('week', ['1'])[0])
+            season = int(params.get('dates', [str(datetime.now().year)])[0])
+            state = stub.state_for(week)
+
+            if state == 'malformed':
+                return self._send(200, fixtures['malformed'])
+            return self._send(200, json.dumps(payload_for_week(fixtures[state], season, week)))
+
+        def log_message(self, format, *args):
+            if not self.server.quiet:
+                super().log_message(format, *args)
+
+    return ESPNStubHandler
+
+
+def parse_week_states(values):
+    """Convierte ['3=final', '4=in_progress'] en {3: 'final', 4: 'in_progress'}"""
+    week_states = {}
+    for value in values or []:
+        week, _, state = value.partition('=')
+        if state not in STATES:
+            raise argparse.ArgumentTypeError(f'estado inválido: {value}')
+        week_states[int(week)] = state
+    return week_states
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita el scoreboard de ESPN')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--state', choices=STATES, default='final', help='Estado por defecto de todas las semanas')
+    parser.add_argument('--week-state', nargs='*', default=[], help='Estado por semana, p. ej. 3=in_progress')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latencia fija por respuesta (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Latencia aleatoria adicional (segundos)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas 503 (0-1)')
+    parser.add_argument('--quiet', action='store_true', help='No imprimir cada request')
+    args = parser.parse_args()
+
+    stub = StubState(args.state, parse_week_states(args.week_state),
+                     args.latency, args.jitter, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(load_fixtures(), stub))
+    server.quiet = args.quiet
+
+    print(f"🏈 ESPN stub escuchando en http://{args.host}:{args.port}{SCOREBOARD_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("⏹️ ESPN stub detenido")
+
+
+if __name__ == '__main__':
+    main()
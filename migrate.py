@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Script de migración e inicialización de base de datos PostgreSQL.
-Crea las tablas e inicializa la configuración del sistema.
+Crea las tablas que falten, aplica las migraciones versionadas pendientes
+(registradas en schema_migrations) e inicializa la configuración del sistema.
+Cada migración es idempotente: si se interrumpe, se puede volver a ejecutar.
 """
 
 import os
@@ -15,23 +17,244 @@ from config import DevelopmentConfig
 from quinielasapp.models import database
 from quinielasapp.models.models import *
 from quinielasapp.services.database_service import create_default_admin, initialize_system_config
+from quinielasapp.services.scoring_service import rebuild_weekly_scores, apply_game_results
+from peewee import fn, Select
+from playhouse.migrate import PostgresqlMigrator, migrate
 
 def create_all_tables():
-    """Crea todas las tablas en PostgreSQL"""
+    """
+    Crea en PostgreSQL las tablas que todavía no existen (con sus índices).
+    Las tablas existentes no se tocan: columnas e índices nuevos llegan por migraciones,
+    así un índice nuevo en Meta no se crea bloqueando una tabla con datos.
+    """
     print("Creando tablas...")
     
-    # Crear todas las tablas
-    database.create_tables([
+    models = [
         User,
         League, 
         LeagueMembership,
         Pick,
         GameResult,
+        Game,
+        WeeklyScore,
+        CumulativeScore,
         WinnersHistory,
-        SystemConfig
-    ], safe=True)  # safe=True no da error si ya existen
+        SystemConfig,
+        SchemaMigration
+    ]
+    missing = [model for model in models if not model.table_exists()]
+    database.create_tables(missing, safe=True)  # safe=True no da error si ya existen
     
-    print("✅ Tablas creadas exitosamente")
+    print(f"✅ Tablas creadas exitosamente ({len(missing)} nuevas)")
+
+def add_column_if_missing(table, column_name, field):
+    """
+    Agrega una columna a una tabla existente (create_tables no altera tablas).
+    PostgresqlMigrator.add_column también crea el índice si el campo tiene index=True,
+    así que para columnas indexadas se pasa un campo sin índice y el índice va en
+    otra migración con create_index_concurrently.
+    """
+    columns = [column.name for column in database.get_columns(table)]
+    if column_name in columns:
+        return False
+    
+    print(f"Agregando columna {table}.{column_name}...")
+    migrator = PostgresqlMigrator(database)
+    with database.atomic():
+        migrate(migrator.add_column(table, column_name, field))
+    return True
+
+def migrate_pick_selection_abbr():
+    """
+    Agrega picks.selection_abbr (si no existe) y la rellena una sola vez.
+    Los picks con la abreviatura directa se actualizan en una sola sentencia;
+    solo los guardados como dict serializado se normalizan en Python.
+    """
+    # Sin index=True: el índice se crea después con CONCURRENTLY (migración 11), fuera de esta transacción
+    add_column_if_missing('picks', 'selection_abbr', CharField(max_length=100, null=True))
+
+    with database.atomic():
+        simple = (Pick
+                  .update(selection_abbr=fn.TRIM(Pick.selection))
+                  .where(Pick.selection_abbr.is_null() & ~(Pick.selection.startswith('{')))
+                  .execute())
+
+        legacy = 0
+        for pick in (Pick
+                     .select(Pick.id, Pick.selection)
+                     .where(Pick.selection_abbr.is_null())):
+            abbr = normalize_selection(pick.selection)
+            if abbr:
+                Pick.update(selection_abbr=abbr).where(Pick.id == pick.id).execute()
+                legacy += 1
+
+    print(f"✅ selection_abbr rellenada: {simple} picks simples, {legacy} en formato anterior")
+
+def migrate_pick_is_correct():
+    """Agrega picks.is_correct; se rellena al recalcular weekly_scores"""
+    add_column_if_missing('picks', 'is_correct', Pick.is_correct)
+
+def migrate_game_slots():
+    """Agrega games.slot y asigna slots a los juegos existentes (orden de inicio por semana)"""
+    add_column_if_missing('games', 'slot', Game.slot)
+    
+    assigned = 0
+    with database.atomic():
+        used = {}
+        pending = []
+        for game in Game.select().order_by(Game.season, Game.season_type, Game.week, Game.kickoff, Game.espn_id):
+            key = (game.season, game.season_type, game.week)
+            used.setdefault(key, set())
+            if game.slot is None:
+                pending.append((key, game))
+            else:
+                used[key].add(game.slot)
+        
+        for key, game in pending:
+            slot = 0
+            while slot in used[key]:
+                slot += 1
+            used[key].add(slot)
+            Game.update(slot=slot).where(Game.id == game.id).execute()
+            assigned += 1
+    
+    print(f"✅ Slots asignados a {assigned} juegos")
+
+def migrate_weekly_score_masks():
+    """Agrega las máscaras de bits a weekly_scores; se rellenan al recalcular"""
+    add_column_if_missing('weekly_scores', 'picked_mask', WeeklyScore.picked_mask)
+    add_column_if_missing('weekly_scores', 'home_mask', WeeklyScore.home_mask)
+
+def backfill_weekly_scores():
+    """Califica los picks y recalcula weekly_scores y cumulative_scores para todas las semanas con picks (idempotente)"""
+    weeks = rebuild_weekly_scores()
+    print(f"✅ weekly_scores y cumulative_scores recalculadas para {len(weeks)} semanas")
+
+def create_index_concurrently(model, *field_names):
+    """
+    Crea con CREATE INDEX CONCURRENTLY (sin bloquear escrituras) el índice declarado
+    en Meta.indexes del modelo para esos campos, con el mismo nombre que usaría create_tables.
+    Un índice inválido de un intento anterior interrumpido se elimina y se vuelve a crear.
+    """
+    if database.in_transaction():
+        raise RuntimeError('CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción')
+    
+    columns = [model._meta.fields[name].column_name for name in field_names]
+    index = next(index for index in model._meta.fields_to_index()
+                 if [field.column_name for field in index._expressions] == columns)
+    
+    row = database.execute_sql(
+        'SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = %s',
+        (index._name,)
+    ).fetchone()
+    if row and row[0]:
+        print(f"⏭️ Índice {index._name} ya existe")
+        return False
+    if row:
+        print(f"⚠️ Índice {index._name} inválido; se vuelve a crear")
+        database.execute_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{index._name}"')
+    
+    print(f"Creando índice {index._name}...")
+    quoted = ', '.join(f'"{column}"' for column in columns)
+    database.execute_sql(
+        f'CREATE {"UNIQUE " if index._unique else ""}INDEX CONCURRENTLY IF NOT EXISTS '
+        f'"{index._name}" ON "{model._meta.table_name}" ({quoted})'
+    )
+    return True
+
+def dedupe_game_results():
+    """
+    Deja un solo resultado por (semana, juego): el actualizado más recientemente.
+    Los picks de los juegos afectados se vuelven a calificar con el resultado que queda.
+    """
+    ranked = (GameResult
+              .select(GameResult.id, GameResult.week, GameResult.game_id,
+                      fn.ROW_NUMBER().over(partition_by=[GameResult.week, GameResult.game_id],
+                                           order_by=[GameResult.updated_at.desc(), GameResult.id.desc()])
+                      .alias('position'))
+              .alias('ranked'))
+    duplicates = list(Select([ranked], [ranked.c.id, ranked.c.week, ranked.c.game_id])
+                      .where(ranked.c.position > 1)
+                      .bind(database)
+                      .tuples())
+    if not duplicates:
+        return 0
+    
+    affected = {}
+    for _, week, game_id in duplicates:
+        affected.setdefault(week, set()).add(game_id)
+    
+    with database.atomic():
+        GameResult.delete().where(GameResult.id.in_([row[0] for row in duplicates])).execute()
+        for week, game_ids in affected.items():
+            apply_game_results(week, sorted(game_ids))
+    
+    print(f"✅ {len(duplicates)} resultados duplicados eliminados")
+    return len(duplicates)
+
+def migrate_game_results_unique():
+    dedupe_game_results()
+    create_index_concurrently(GameResult, 'week', 'game_id')
+
+def migrate_picks_league_week_index():
+    create_index_concurrently(Pick, 'league', 'week')
+
+def migrate_memberships_league_active_index():
+    create_index_concurrently(LeagueMembership, 'league', 'is_active')
+
+def migrate_winners_week_index():
+    create_index_concurrently(WinnersHistory, 'week')
+
+def migrate_picks_selection_abbr_index():
+    create_index_concurrently(Pick, 'selection_abbr')
+    # Versiones anteriores de la migración 1 lo creaban con el nombre de la tabla
+    database.execute_sql('DROP INDEX CONCURRENTLY IF EXISTS "picks_selection_abbr"')
+
+def migrate_pick_selection_abbr_length():
+    """
+    Amplía picks.selection_abbr al mismo largo que picks.selection: los picks antiguos
+    guardaban el nombre completo del equipo y no cabían en 10 caracteres.
+    """
+    migrator = PostgresqlMigrator(database)
+    migrate(migrator.alter_column_type('picks', 'selection_abbr', CharField(max_length=100, null=True)))
+
+# (versión, nombre, función, transaccional). Las que crean índices CONCURRENTLY
+# corren fuera de transacción; nunca renumerar ni quitar una migración ya publicada.
+MIGRATIONS = [
+    (1, 'picks_selection_abbr', migrate_pick_selection_abbr, True),
+    (2, 'picks_is_correct', migrate_pick_is_correct, True),
+    (3, 'games_slot', migrate_game_slots, True),
+    (4, 'weekly_scores_masks', migrate_weekly_score_masks, True),
+    (5, 'backfill_weekly_scores', backfill_weekly_scores, True),
+    (6, 'game_results_unique_week_game', migrate_game_results_unique, False),
+    (7, 'picks_league_week_index', migrate_picks_league_week_index, False),
+    (8, 'league_memberships_league_active_index', migrate_memberships_league_active_index, False),
+    (9, 'winners_history_week_index', migrate_winners_week_index, False),
+    (10, 'picks_selection_abbr_length', migrate_pick_selection_abbr_length, True),
+    (11, 'picks_selection_abbr_index', migrate_picks_selection_abbr_index, False),
+    (12, 'weekly_scores_team_masks', backfill_weekly_scores, True),
+]
+
+def run_migrations():
+    """Aplica en orden las migraciones que no están en schema_migrations"""
+    applied = {row.version for row in SchemaMigration.select(SchemaMigration.version)}
+    pending = [migration for migration in MIGRATIONS if migration[0] not in applied]
+    if not pending:
+        print("✅ Esquema al día")
+        return []
+    
+    for version, name, step, transactional in pending:
+        print(f"➡️ Migración {version:03d}: {name}")
+        if transactional:
+            with database.atomic():
+                step()
+                SchemaMigration.create(version=version, name=name)
+        else:
+            step()
+            SchemaMigration.create(version=version, name=name)
+    
+    print(f"✅ {len(pending)} migraciones aplicadas")
+    return [version for version, _, _, _ in pending]
 
 def check_existing_data():
     """Verificar si ya hay datos en PostgreSQL"""
@@ -74,6 +297,9 @@ def main():
     # Crear tablas
     create_all_tables()
     
+    # Columnas, índices y datos agregados después de la creación inicial
+    run_migrations()
+    
     # Verificar si hay datos existentes
     if check_existing_data():
         print("⏭️ Saltando inicialización - datos ya existen")
@@ -1,4 +1,9 @@
+import heapq
 import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
 # Importar pg8000 y Peewee con soporte explícito
@@ -11,10 +16,133 @@ except ImportError:
     print("❌ pg8000 no disponible")
 
 from peewee import *
+from playhouse.pool import PooledDatabase, PooledPostgresqlDatabase
 
 # Solo PostgreSQL con pg8000
 print("🐘 Configurando PostgreSQL con pg8000...")
 
+# Pool de conexiones: cada request toma una conexión y la regresa al terminar
+POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', '10'))
+POOL_STALE_TIMEOUT = int(os.environ.get('DB_POOL_STALE_TIMEOUT', '300'))  # Segundos de vida de una conexión
+POOL_WAIT_TIMEOUT = int(os.environ.get('DB_POOL_WAIT_TIMEOUT', '10'))  # Espera máxima por una conexión libre
+POOL_IDLE_PING = int(os.environ.get('DB_POOL_IDLE_PING', '30'))  # Inactividad tras la que se hace ping
+POOL_IDLE_TIMEOUT = int(os.environ.get('DB_POOL_IDLE_TIMEOUT', '120'))  # Inactividad tras la que se cierra (0 = nunca)
+
+# Versión del servidor: se consulta una sola vez por proceso
+_server_version = None
+_server_version_lock = threading.Lock()
+
+
+def _probe_server_version(conn):
+    """Obtiene la versión del servidor con la primera conexión y la reutiliza después"""
+    global _server_version
+    with _server_version_lock:
+        if _server_version is not None:
+            return _server_version
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version()")
+            version_str = cursor.fetchone()[0]
+            cursor.close()
+            
+            # Extraer número de versión (ej: "PostgreSQL 14.9" -> 140009)
+            match = re.search(r'PostgreSQL (\d+)\.(\d+)', version_str)
+            if match:
+                major, minor = match.groups()
+                _server_version = int(major) * 10000 + int(minor) * 100
+            else:
+                _server_version = 130000  # Default fallback
+                
+            print(f"🔢 Server version detectada: {_server_version}")
+        except Exception as e:
+            print(f"⚠️ No se pudo obtener server_version: {e}")
+            return 130000  # Default fallback; se vuelve a intentar con la siguiente conexión
+        return _server_version
+
+class IdleTimeoutPoolMixin:
+    """
+    Cierra las conexiones que llevan más de POOL_IDLE_TIMEOUT segundos sin usarse en el pool,
+    para no ocupar conexiones de PostgreSQL en los periodos sin tráfico.
+    Un hilo por proceso las revisa periódicamente; además se descartan al intentar reutilizarlas.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        self._returned_at = {}  # id(conn) -> momento en que regresó al pool
+        self._reaper_pid = None
+        super().__init__(*args, **kwargs)
+    
+    def _connect(self):
+        self._start_idle_reaper()
+        return super()._connect()
+    
+    def _is_closed(self, conn):
+        returned_at = self._returned_at.pop(self.conn_key(conn), None)
+        idle = None if returned_at is None else time.time() - returned_at
+        if idle is not None and POOL_IDLE_TIMEOUT and idle >= POOL_IDLE_TIMEOUT:
+            self._close_quietly(conn)
+            return True
+        return self._is_broken(conn, idle)
+    
+    def _is_broken(self, conn, idle):
+        """Verifica una conexión que va a salir del pool; `idle` son los segundos que estuvo sin usarse"""
+        return super()._is_closed(conn)
+    
+    def _can_reuse(self, conn):
+        if not super()._can_reuse(conn):
+            return False
+        self._returned_at[self.conn_key(conn)] = time.time()
+        return True
+    
+    def _close(self, conn, close_conn=False):
+        if close_conn:
+            self._returned_at.pop(self.conn_key(conn), None)
+        super()._close(conn, close_conn)
+    
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def close_idle_connections(self, idle_timeout=None):
+        """Cierra las conexiones libres que llevan más de `idle_timeout` segundos sin usarse"""
+        idle_timeout = POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        cutoff = time.time() - idle_timeout
+        closed = 0
+        with self._pool_lock:
+            keep = []
+            for entry in self._connections:
+                conn = entry[2]
+                if self._returned_at.get(self.conn_key(conn), cutoff) <= cutoff:
+                    self._returned_at.pop(self.conn_key(conn), None)
+                    self._close_quietly(conn)
+                    closed += 1
+                else:
+                    keep.append(entry)
+            heapq.heapify(keep)
+            self._connections = keep
+        return closed
+    
+    def _start_idle_reaper(self):
+        # Se inicia con la primera conexión de cada proceso (después del fork de Gunicorn)
+        with self._pool_lock:
+            if not POOL_IDLE_TIMEOUT or self._reaper_pid == os.getpid():
+                return
+            self._reaper_pid = os.getpid()
+        
+        def reap():
+            while True:
+                time.sleep(max(1, POOL_IDLE_TIMEOUT / 2))
+                try:
+                    closed = self.close_idle_connections()
+                    if closed:
+                        print(f"🧹 {closed} conexiones inactivas cerradas")
+                except Exception as e:
+                    print(f"⚠️ Error cerrando conexiones inactivas: {e}")
+        
+        threading.Thread(target=reap, name='db-pool-reaper', daemon=True).start()
+
+
 # Configuración de base de datos - Solo PostgreSQL
 database_url = os.environ.get('DATABASE_URL')
 
@@ -54,55 +182,91 @@ if database_url:
             
             conn = pg8000.dbapi.connect(**conn_params)
             
+            # Igual que Peewee con psycopg2: fuera de atomic() cada sentencia se confirma sola
+            # (y CREATE INDEX CONCURRENTLY puede ejecutarse)
+            conn.autocommit = True
+            
             # Agregar server_version manualmente para compatibilidad con Peewee
             if not hasattr(conn, 'server_version'):
-                try:
-                    # Obtener versión del servidor
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT version()")
-                    version_str = cursor.fetchone()[0]
-                    cursor.close()
-                    
-                    # Extraer número de versión (ej: "PostgreSQL 14.9" -> 140009)
-                    import re
-                    match = re.search(r'PostgreSQL (\d+)\.(\d+)', version_str)
-                    if match:
-                        major, minor = match.groups()
-                        conn.server_version = int(major) * 10000 + int(minor) * 100
-                    else:
-                        conn.server_version = 130000  # Default fallback
-                        
-                    print(f"🔢 Server version detectada: {conn.server_version}")
-                except Exception as e:
-                    print(f"⚠️ No se pudo obtener server_version: {e}")
-                    conn.server_version = 130000  # Default fallback
+                conn.server_version = _probe_server_version(conn)
             
             return conn
     
+    class PooledPg8000PostgresDatabase(IdleTimeoutPoolMixin, PooledDatabase, Pg8000PostgresDatabase):
+        """
+        Pool sobre pg8000. pg8000 no expone el estado de la transacción como psycopg2,
+        así que se hace ping a las conexiones que llevan inactivas más de POOL_IDLE_PING
+        y al regresar una conexión se hace rollback de lo que haya quedado pendiente.
+        """
+        
+        def _is_broken(self, conn, idle):
+            if idle is None or idle < POOL_IDLE_PING:
+                return False
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                cursor.close()
+                conn.rollback()
+                return False
+            except Exception as e:
+                print(f"⚠️ Conexión del pool descartada: {e}")
+                self._close_quietly(conn)
+                return True
+        
+        def _can_reuse(self, conn):
+            try:
+                conn.rollback()
+            except Exception:
+                return False
+            return super()._can_reuse(conn)
+    
     # Crear instancia con configuración manual
-    database = Pg8000PostgresDatabase(
+    database = PooledPg8000PostgresDatabase(
         result.path[1:],  # database name
         user=result.username,
         password=result.password,
         host=result.hostname,
         port=result.port or 5432,
+        max_connections=POOL_MAX_CONNECTIONS,
+        stale_timeout=POOL_STALE_TIMEOUT,
+        timeout=POOL_WAIT_TIMEOUT,
         autoconnect=False
     )
-    print("✅ Base de datos configurada con pg8000 forzado")
+    print(f"✅ Base de datos configurada con pg8000 forzado (pool de {POOL_MAX_CONNECTIONS} conexiones)")
     
 else:
     # Desarrollo local - usar variables individuales
-    database = PostgresqlDatabase(
+    class IdleTimeoutPostgresqlDatabase(IdleTimeoutPoolMixin, PooledPostgresqlDatabase):
+        pass
+    
+    database = IdleTimeoutPostgresqlDatabase(
         os.environ.get('DB_NAME', 'quiniela_dev'),
         user=os.environ.get('DB_USER', 'postgres'),
         password=os.environ.get('DB_PASSWORD', 'dev_password123'),
         host=os.environ.get('DB_HOST', 'localhost'),
         port=int(os.environ.get('DB_PORT', '5432')),
+        max_connections=POOL_MAX_CONNECTIONS,
+        stale_timeout=POOL_STALE_TIMEOUT,
+        timeout=POOL_WAIT_TIMEOUT,
         autoconnect=False,
         options={'sslmode': 'prefer'}
     )
     print("✅ Configuración PostgreSQL local lista")
 
+
+@contextmanager
+def pooled_connection():
+    """
+    Toma una conexión del pool solo mientras dura el bloque.
+    Si el hilo ya tiene una abierta (p. ej. dentro de un request) la usa y no la cierra.
+    """
+    if not database.is_closed():
+        yield
+        return
+    with database.connection_context():
+        yield
+
 class BaseModel(Model):
     class Meta:
         database = database
\ No newline at end of file
@@ -1,8 +1,32 @@
 from datetime import datetime
 import hashlib
+import json
+import threading
+import time
 from peewee import *
 from quinielasapp.models import BaseModel
 
+
+def normalize_selection(selection):
+    """
+    Abreviatura canónica del equipo elegido en un pick.
+    Acepta la abreviatura directa, un dict o el dict serializado como texto
+    ("{'name': ..., 'abbreviation': ...}") que guardaban versiones anteriores.
+    """
+    if selection is None:
+        return None
+    if isinstance(selection, dict):
+        return selection.get('abbreviation') or selection.get('name') or None
+
+    selection = str(selection).strip()
+    if selection.startswith('{') and selection.endswith('}'):
+        try:
+            data = json.loads(selection.replace("'", '"'))
+            return data.get('abbreviation') or data.get('name') or None
+        except (json.JSONDecodeError, ValueError, AttributeError):
+            pass
+    return selection or None
+
 class League(BaseModel):
     name = CharField(max_length=100)
     code = CharField(unique=True, max_length=10)
@@ -68,7 +92,10 @@ class LeagueMembership(BaseModel):
     
     class Meta:
         table_name = 'league_memberships'
-        indexes = ((('user', 'league'), True),)  # Índice único
+        indexes = (
+            (('user', 'league'), True),  # Índice único
+            (('league', 'is_active'), False),  # Miembros activos de una liga
+        )
 
 class Pick(BaseModel):
     user = ForeignKeyField(User, backref='picks')
@@ -76,11 +103,21 @@ class Pick(BaseModel):
     week = IntegerField()
     game_id = CharField(max_length=50)
     selection = CharField(max_length=100)
+    selection_abbr = CharField(max_length=100, null=True, index=True)  # Abreviatura canónica para calificar
+    is_correct = BooleanField(null=True)  # None = sin resultado; se marca al registrar el resultado del juego
     created_at = DateTimeField(default=datetime.now)
     
     class Meta:
         table_name = 'picks'
-        indexes = ((('user', 'league', 'week', 'game_id'), True),)  # Índice único
+        indexes = (
+            (('user', 'league', 'week', 'game_id'), True),  # Índice único
+            (('league', 'week'), False),  # Picks de una liga en la semana (grid, ranking)
+        )
+    
+    def save(self, *args, **kwargs):
+        """Mantiene selection_abbr sincronizada con selection"""
+        self.selection_abbr = normalize_selection(self.selection)
+        return super().save(*args, **kwargs)
 
 class GameResult(BaseModel):
     week = IntegerField()
@@ -94,6 +131,62 @@ class GameResult(BaseModel):
     
     class Meta:
         table_name = 'game_results'
+        indexes = ((('week', 'game_id'), True),)  # Un resultado por juego
+
+class Game(BaseModel):
+    espn_id = CharField(unique=True, max_length=50)  # ID del evento en ESPN
+    season = IntegerField()
+    season_type = IntegerField(default=2)  # 1 = pretemporada, 2 = regular, 3 = playoffs
+    week = IntegerField()
+    slot = IntegerField(null=True)  # Posición estable del juego en su semana (bit en las máscaras de picks)
+    name = CharField(max_length=150, null=True)
+    kickoff = DateTimeField(null=True)  # Hora de inicio en UTC
+    home_team = CharField(max_length=10)  # Abreviatura
+    home_name = CharField(max_length=100)
+    home_logo = CharField(max_length=255, null=True)
+    home_score = IntegerField(default=0)
+    away_team = CharField(max_length=10)  # Abreviatura
+    away_name = CharField(max_length=100)
+    away_logo = CharField(max_length=255, null=True)
+    away_score = IntegerField(default=0)
+    status = CharField(max_length=50, default='Scheduled')
+    clock = CharField(max_length=20, null=True)
+    period = IntegerField(default=0)
+    completed = BooleanField(default=False)
+    updated_at = DateTimeField(default=datetime.now)  # Última vez que se sincronizó con ESPN
+    
+    class Meta:
+        table_name = 'games'
+        indexes = ((('season', 'week'), False),)  # Índice para buscar juegos por semana
+
+class WeeklyScore(BaseModel):
+    league = ForeignKeyField(League, backref='weekly_scores')
+    user = ForeignKeyField(User, backref='weekly_scores')
+    season = IntegerField()
+    week = IntegerField()
+    correct = IntegerField(default=0)  # Picks acertados con resultado registrado
+    total = IntegerField(default=0)  # Picks hechos en la semana
+    picked_mask = IntegerField(default=0)  # Bit Game.slot encendido por cada juego con pick
+    home_mask = IntegerField(default=0)  # Bit encendido si el pick fue al equipo local
+    updated_at = DateTimeField(default=datetime.now)
+    
+    class Meta:
+        table_name = 'weekly_scores'
+        indexes = ((('league', 'season', 'week', 'user'), True),)  # Índice único; standings por liga y semana
+
+class CumulativeScore(BaseModel):
+    """Suma prefija de weekly_scores: aciertos y picks acumulados hasta cada semana"""
+    league = ForeignKeyField(League, backref='cumulative_scores')
+    user = ForeignKeyField(User, backref='cumulative_scores')
+    season = IntegerField()
+    week = IntegerField()
+    correct = IntegerField(default=0)  # Aciertos acumulados de la semana 1 a `week`
+    total = IntegerField(default=0)  # Picks acumulados de la semana 1 a `week`
+    updated_at = DateTimeField(default=datetime.now)
+    
+    class Meta:
+        table_name = 'cumulative_scores'
+        indexes = ((('league', 'season', 'user', 'week'), True),)  # Índice único; última semana <= N por usuario
 
 class WinnersHistory(BaseModel):
     user_id = IntegerField()  # ID del usuario ganador
@@ -106,7 +199,21 @@ class WinnersHistory(BaseModel):
     
     class Meta:
         table_name = 'winners_history'
-        indexes = ((('league_id', 'week'), False),)  # Índice para buscar por liga y semana
+        indexes = (
+            (('league_id', 'week'), False),  # Índice para buscar por liga y semana
+            (('week',), False),  # Ganadores de una semana en todas las ligas
+        )
+
+class SchemaMigration(BaseModel):
+    """Migraciones versionadas ya aplicadas (ver migrate.py)"""
+    version = IntegerField(unique=True)
+    name = CharField(max_length=100)
+    applied_at = DateTimeField(default=datetime.now)
+    
+    class Meta:
+        table_name = 'schema_migrations'
+
+CONFIG_CACHE_RECHECK_SECONDS = 5  # Cada cuánto se compara la versión de system_config
 
 class SystemConfig(BaseModel):
     config_key = CharField(unique=True, max_length=50)
@@ -116,13 +223,49 @@ class SystemConfig(BaseModel):
     class Meta:
         table_name = 'system_config'
     
+    # Caché en proceso de toda la tabla. set_config la invalida en este proceso;
+    # los demás workers detectan el cambio comparando (MAX(updated_at), COUNT(*))
+    # como máximo cada CONFIG_CACHE_RECHECK_SECONDS.
+    _cache = None
+    _cache_version = None
+    _cache_checked_at = 0.0
+    _cache_lock = threading.Lock()
+    
+    @classmethod
+    def _table_version(cls):
+        return cls.select(fn.MAX(cls.updated_at), fn.COUNT(cls.id)).tuples().get()
+    
+    @classmethod
+    def get_all(cls):
+        """Toda la configuración como dict (desde la caché; no modificar el resultado)"""
+        now = time.monotonic()
+        with cls._cache_lock:
+            if cls._cache is not None and now - cls._cache_checked_at < CONFIG_CACHE_RECHECK_SECONDS:
+                return cls._cache
+        
+        version = cls._table_version()
+        with cls._cache_lock:
+            if cls._cache is not None and version == cls._cache_version:
+                cls._cache_checked_at = now
+                return cls._cache
+        
+        # La versión se lee antes que las filas: si algo cambia en medio, la siguiente revisión recarga
+        configs = {key: value for key, value in cls.select(cls.config_key, cls.config_value).tuples()}
+        with cls._cache_lock:
+            cls._cache = configs
+            cls._cache_version = version
+            cls._cache_checked_at = now
+        return configs
+    
+    @classmethod
+    def invalidate_cache(cls):
+        with cls._cache_lock:
+            cls._cache = None
+    
     @classmethod
     def get_config(cls, key, default=None):
         """Helper para obtener configuración"""
-        try:
-            return cls.get(cls.config_key == key).config_value
-        except cls.DoesNotExist:
-            return default
+        return cls.get_all().get(key, default)
     
     @classmethod 
     def set_config(cls, key, value):
@@ -138,4 +281,5 @@ class SystemConfig(BaseModel):
                 config.config_value = str(value)
                 config.updated_at = datetime.now()
                 config.save()
+        cls.invalidate_cache()
         return config
\ No newline at end of file
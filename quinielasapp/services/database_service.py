@@ -7,6 +7,7 @@ from datetime import datetime
 import hashlib
 from quinielasapp.models.models import *
 from quinielasapp.models import database
+from quinielasapp.services.scoring_service import get_weekly_standings
 from peewee import fn
 import string
 import random
@@ -42,10 +43,7 @@ def set_current_week(week):
 
 def get_system_config():
     """Obtiene toda la configuración del sistema como dict"""
-    configs = {}
-    for config in SystemConfig.select():
-        configs[config.config_key] = config.config_value
-    return configs
+    return dict(SystemConfig.get_all())
 
 def generate_league_code():
     """Genera un código único para una liga"""
@@ -110,107 +108,33 @@ def get_user_leagues(user_id):
     """
     try:
         user = User.get_by_id(user_id)
-        
-        if user.is_admin:
-            # Admin ve todas las ligas
-            leagues = League.select().order_by(League.created_at.desc())
-        else:
-            # Usuario normal ve solo sus ligas
-            leagues = (League.select()
-                      .join(LeagueMembership)
-                      .where((LeagueMembership.user == user) & 
-                             (LeagueMembership.is_active == True))
-                      .order_by(LeagueMembership.joined_at.desc()))
-        
-        return list(leagues)
+        return get_leagues_for_user(user)
         
     except User.DoesNotExist:
         return []
 
+def get_leagues_for_user(user):
+    """Igual que get_user_leagues pero con el usuario ya cargado (sin volver a consultarlo)"""
+    if user.is_admin:
+        # Admin ve todas las ligas
+        leagues = League.select().order_by(League.created_at.desc())
+    else:
+        # Usuario normal ve solo sus ligas
+        leagues = (League.select()
+                  .join(LeagueMembership)
+                  .where((LeagueMembership.user == user) & 
+                         (LeagueMembership.is_active == True))
+                  .order_by(LeagueMembership.joined_at.desc()))
+    
+    return list(leagues)
+
 def get_user_standings_by_league(league_id):
-    """Obtiene el ranking de usuarios en una liga específica para la semana actual"""
+    """
+    Obtiene el ranking de usuarios en una liga específica para la semana actual.
+    Lee la tabla weekly_scores, que se mantiene al guardar picks y procesar resultados.
+    """
     try:
-        from quinielasapp.models.models import LeagueMembership
-        from shared_utils import get_current_week
-        
-        # Obtener la semana actual
-        current_week = get_current_week()
-        
-        # Obtener usuarios de la liga
-        users = User.select().join(LeagueMembership).where(
-            (LeagueMembership.league_id == league_id) & 
-            (LeagueMembership.is_active == True)
-        )
-        
-        standings_data = []
-        
-        for user in users:
-            # Contar picks totales del usuario en esta liga y semana actual
-            total_picks = Pick.select().where(
-                (Pick.user == user) & 
-                (Pick.league_id == league_id) &
-                (Pick.week == current_week)
-            ).count()
-            
-            if total_picks == 0:
-                continue
-                
-            # Obtener resultados de juegos de la semana actual
-            results = GameResult.select().where(GameResult.week == current_week)
-            results_dict = {result.game_id: result for result in results}
-            
-            # Contar picks correctos de la semana actual
-            correct_picks = 0
-            user_picks = Pick.select().where(
-                (Pick.user == user) & 
-                (Pick.league_id == league_id) &
-                (Pick.week == current_week)
-            )
-            
-            for pick in user_picks:
-                try:
-                    if pick.game_id in results_dict:
-                        result = results_dict[pick.game_id]
-                        
-                        # Manejar diferentes formatos de pick.selection
-                        if isinstance(pick.selection, dict):
-                            pick_value = pick.selection.get('abbreviation', pick.selection.get('name', ''))
-                        elif isinstance(pick.selection, str):
-                            # Intentar parsear JSON si parece un diccionario
-                            import json
-                            if pick.selection.startswith('{') and pick.selection.endswith('}'):
-                                json_string = pick.selection.replace("'", '"')
-                                picked_team_data = json.loads(json_string)
-                                pick_value = picked_team_data.get('abbreviation', picked_team_data.get('name', ''))
-                            else:
-                                pick_value = pick.selection
-                        else:
-                            pick_value = str(pick.selection)
-                        
-                        if pick_value == result.winner:
-                            correct_picks += 1
-                except Exception as pick_error:
-                    print(f"Error processing pick for user {user.username}: {pick_error}")
-                    continue
-            
-            percentage = (correct_picks / total_picks * 100) if total_picks > 0 else 0
-            
-            standings_data.append({
-                'username': user.username,
-                'nombre': user.first_name or '',
-                'apellido': user.last_name or '',
-                'first_name': user.first_name,  # Para compatibilidad con template
-                'last_name': user.last_name,    # Para compatibilidad con template
-                'correct_picks': correct_picks,
-                'total_picks': total_picks,
-                'percentage': percentage,
-                'total_score': correct_picks,  # Para admin modal
-                'score': correct_picks  # Para template standings_partial.html
-            })
-        
-        # Ordenar por total_score descendente
-        standings_data.sort(key=lambda x: x['total_score'], reverse=True)
-        return standings_data
+        return get_weekly_standings(get_current_week(), league_id=league_id)
         
     except Exception as e:
         import traceback
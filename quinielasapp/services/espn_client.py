@@ -0,0 +1,245 @@
+"""
+Cliente HTTP para la API de ESPN.
+Reutiliza conexiones (keep-alive), reintenta con backoff y jitter
+y corta las llamadas con un circuit breaker cuando ESPN está caído.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# URL del scoreboard; apuntarla a espn_stub.py permite trabajar sin red
+ESPN_SCOREBOARD_URL = os.environ.get(
+    'ESPN_SCOREBOARD_URL',
+    'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
+)
+
+# Configuración (segundos / número de intentos)
+ESPN_TIMEOUT = float(os.environ.get('ESPN_TIMEOUT', '10'))
+ESPN_RETRIES = int(os.environ.get('ESPN_RETRIES', '2'))
+ESPN_BACKOFF = float(os.environ.get('ESPN_BACKOFF', '0.5'))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('ESPN_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('ESPN_BREAKER_RESET', '60'))
+
+# Códigos HTTP que vale la pena reintentar
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Errores de red que vale la pena reintentar (JSON inválido incluido)
+RETRYABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.HTTPError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+    requests.exceptions.JSONDecodeError,
+)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """El circuit breaker está abierto y no hay respuesta previa que servir"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados.
+    - closed: las llamadas pasan normalmente
+    - open: después de N fallos seguidos, se rechazan las llamadas por `reset_timeout` segundos
+    - half_open: pasado ese tiempo se deja pasar una llamada de prueba
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Indica si se puede llamar a ESPN en este momento"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at >= self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                    return True
+                return False
+            if self.state == self.HALF_OPEN:
+                # Solo una llamada de prueba a la vez
+                return False
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ Circuit breaker de ESPN abierto tras {self.consecutive_failures} fallos")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ESPNClient:
+    """Cliente compartido por el proceso para consultar el scoreboard de ESPN"""
+
+    def __init__(self, base_url=ESPN_SCOREBOARD_URL, timeout=ESPN_TIMEOUT,
+                 retries=ESPN_RETRIES, backoff=ESPN_BACKOFF, breaker=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        # Sesión con pool de conexiones keep-alive (sin reintentos de urllib3, los manejamos aquí)
+        self.session = requests.Session()
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Última respuesta buena por combinación de parámetros
+        self._last_good = {}
+
+        # Métricas
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.served_last_good = 0
+        self.latencies_ms = deque(maxlen=200)
+
+    def _record_latency(self, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.latencies_ms.append(elapsed_ms)
+        return elapsed_ms
+
+    def _sleep_before_retry(self, attempt):
+        """Backoff exponencial con jitter completo"""
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _serve_last_good(self, key, error):
+        """Regresa la última respuesta buena o relanza el error si no hay"""
+        payload = self._last_good.get(key)
+        if payload is None:
+            raise error
+        with self._lock:
+            self.served_last_good += 1
+        print(f"⚠️ ESPN no disponible ({error}); sirviendo última respuesta buena")
+        return payload
+
+    def get_scoreboard(self, season, seasontype, week):
+        """Obtiene el JSON del scoreboard de una semana"""
+        key = (season, seasontype, week)
+        params = {'dates': season, 'seasontype': seasontype, 'week': week}
+
+        if not self.breaker.allow_request():
+            return self._serve_last_good(key, CircuitOpenError('Circuit breaker de ESPN abierto'))
+
+        try:
+            data = self._fetch_with_retries(params)
+        except BaseException as e:
+            # Cualquier salida con error cuenta como fallo; si no, el breaker
+            # podría quedarse en half_open para siempre
+            self.breaker.record_failure()
+            if isinstance(e, ValueError) and not isinstance(e, requests.exceptions.RequestException):
+                # JSON inválido: exponerlo como error de red para el manejo existente
+                e = requests.exceptions.RequestException(f"Respuesta inválida de ESPN: {e}")
+            if not isinstance(e, requests.exceptions.RequestException):
+                raise
+            return self._serve_last_good(key, e)
+
+        self.breaker.record_success()
+        self._last_good[key] = data
+        return data
+
+    def _fetch_with_retries(self, params):
+        """Hace la llamada HTTP con reintentos; relanza el último error si todos fallan"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                self.calls += 1
+                if attempt > 0:
+                    self.retried += 1
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+
+                if response.status_code in RETRYABLE_STATUS:
+                    raise requests.exceptions.HTTPError(
+                        f"{response.status_code} desde ESPN", response=response)
+                response.raise_for_status()
+                data = response.json()
+
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # La latencia incluye intentos fallidos (p. ej. timeouts)
+                self._record_latency(started)
+                with self._lock:
+                    self.failures += 1
+                last_error = e
+
+                # Errores 4xx distintos de 429, URLs inválidas o redirecciones
+                # infinitas no se arreglan reintentando
+                response = getattr(e, 'response', None)
+                if response is not None and response.status_code not in RETRYABLE_STATUS:
+                    break
+                if not isinstance(e, RETRYABLE_ERRORS):
+                    break
+                if attempt < self.retries:
+                    self._sleep_before_retry(attempt)
+                continue
+
+            self._record_latency(started)
+            return data
+
+        raise last_error
+
+    def stats(self):
+        """Salud de ESPN: estado del breaker y latencias recientes"""
+        with self._lock:
+            last_latency = self.latencies_ms[-1] if self.latencies_ms else None
+            latencies = sorted(self.latencies_ms)
+            calls = self.calls
+            failures = self.failures
+            retried = self.retried
+            served_last_good = self.served_last_good
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index], 1)
+
+        return {
+            'breaker_state': self.breaker.state,
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'calls': calls,
+            'failures': failures,
+            'retries': retried,
+            'served_last_good': served_last_good,
+            'latency_ms': {
+                'last': round(last_latency, 1) if last_latency is not None else None,
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'max': round(latencies[-1], 1) if latencies else None,
+            },
+        }
+
+
+# Instancia compartida por todo el proceso
+espn_client = ESPNClient()
@@ -0,0 +1,134 @@
+"""
+Eventos de cambio entre dos sincronizaciones del scoreboard.
+Compara la versión anterior de una semana con la nueva y emite eventos
+tipados por juego para que los consumidores actualicen solo lo que cambió.
+"""
+
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Tipos de evento
+GAME_ADDED = 'game_added'
+SCORE_CHANGED = 'score_changed'
+PERIOD_CHANGED = 'period_changed'
+STATUS_CHANGED = 'status_changed'
+GAME_FINAL = 'game_final'
+KICKOFF_MOVED = 'kickoff_moved'
+
+
+@dataclass(frozen=True, slots=True)
+class GameEvent:
+    type: str
+    game_id: str
+    week: int
+    old: Optional[Any] = None
+    new: Optional[Any] = None
+
+    def to_dict(self):
+        return {
+            'type': self.type,
+            'game_id': self.game_id,
+            'week': self.week,
+            'old': str(self.old) if self.old is not None else None,
+            'new': str(self.new) if self.new is not None else None,
+        }
+
+
+def diff_games(previous, current):
+    """
+    Compara dos listas de juegos de la misma semana y regresa los eventos.
+    Sin versión anterior (primera sincronización) solo se emite GAME_FINAL de los juegos
+    que ya terminaron, para que se califiquen aunque nunca se vieran en curso.
+    """
+    if not previous:
+        return [GameEvent(GAME_FINAL, game['id'], game['week'],
+                          new=(game['away_score'], game['home_score']))
+                for game in current if game['completed']]
+
+    previous_by_id = {game['id']: game for game in previous}
+    events = []
+
+    for game in current:
+        old = previous_by_id.get(game['id'])
+        week = game['week']
+
+        if old is None:
+            events.append(GameEvent(GAME_ADDED, game['id'], week, new=game.get('name')))
+            if game['completed']:
+                events.append(GameEvent(GAME_FINAL, game['id'], week,
+                                        new=(game['away_score'], game['home_score'])))
+            continue
+
+        old_score = (old['away_score'], old['home_score'])
+        new_score = (game['away_score'], game['home_score'])
+        if old_score != new_score:
+            events.append(GameEvent(SCORE_CHANGED, game['id'], week, old=old_score, new=new_score))
+
+        if old['period'] != game['period']:
+            events.append(GameEvent(PERIOD_CHANGED, game['id'], week, old=old['period'], new=game['period']))
+
+        if old['status'] != game['status']:
+            events.append(GameEvent(STATUS_CHANGED, game['id'], week, old=old['status'], new=game['status']))
+
+        if game['completed'] and not old['completed']:
+            events.append(GameEvent(GAME_FINAL, game['id'], week, new=new_score))
+
+        if old['date'] != game['date']:
+            events.append(GameEvent(KICKOFF_MOVED, game['id'], week, old=old['date'], new=game['date']))
+
+    return events
+
+
+# =============================================================================
+# PUBLICACIÓN A CONSUMIDORES
+# =============================================================================
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+# Historial reciente para diagnóstico (/admin/scoreboard_stats)
+_event_counts = Counter()
+_recent_events = deque(maxlen=50)
+
+
+def subscribe(listener):
+    """Registra una función que recibe la lista de eventos de cada sincronización"""
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener):
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def publish(events):
+    """Entrega los eventos a cada consumidor; un consumidor que falla no afecta a los demás"""
+    if not events:
+        return
+
+    with _listeners_lock:
+        _event_counts.update(event.type for event in events)
+        _recent_events.extend(events)
+        listeners = list(_listeners)
+
+    for listener in listeners:
+        try:
+            listener(events)
+        except Exception as e:
+            print(f"Error in game event listener {getattr(listener, '__name__', listener)}: {e}")
+
+
+def get_event_stats():
+    """Conteo por tipo y últimos eventos emitidos"""
+    with _listeners_lock:
+        return {
+            'counts': dict(_event_counts),
+            'recent': [event.to_dict() for event in _recent_events],
+            'listeners': len(_listeners),
+        }
@@ -0,0 +1,284 @@
+"""
+Servicios para la tabla de juegos (games).
+Guarda el calendario y el estado en vivo sincronizado desde ESPN.
+Los juegos circulan como GameRecord: registros inmutables con las etiquetas
+de hora ya calculadas y acceso tipo dict compatible con los templates.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import ClassVar, Optional
+from zoneinfo import ZoneInfo
+from peewee import fn, Case
+from quinielasapp.models.models import Game
+from quinielasapp.models import database
+
+SEASON_TYPE_REGULAR = 2
+REGULAR_SEASON_WEEKS = 18
+
+# Mes en que empieza a contar la siguiente temporada: la semana 18 (y a veces la 17)
+# se juega en enero y pertenece a la temporada del año anterior
+SEASON_ROLLOVER_MONTH = 3
+
+# Zona horaria y nombres de días para las etiquetas de inicio (se crean una sola vez)
+CDMX_TZ = ZoneInfo("America/Mexico_City")
+DAYS_SPANISH = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+DAYS_SPANISH_SHORT = ('Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom')
+
+
+def nfl_season(when=None):
+    """Temporada de la NFL de una fecha: el año en que empezó (enero y febrero son del año anterior)"""
+    when = when or datetime.now()
+    return when.year if when.month >= SEASON_ROLLOVER_MONTH else when.year - 1
+
+
+def season_bounds(season):
+    """(inicio, fin) de una temporada como fechas, para filtrar por created_at / declared_at"""
+    return datetime(season, SEASON_ROLLOVER_MONTH, 1), datetime(season + 1, SEASON_ROLLOVER_MONTH, 1)
+
+
+def parse_kickoff(game_date):
+    """Convierte la fecha ISO de ESPN ('2024-09-08T17:00Z') a datetime UTC con tzinfo"""
+    if not game_date:
+        return None
+    try:
+        dt = datetime.fromisoformat(game_date.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def format_start_time(kickoff):
+    """Etiqueta larga en hora de Ciudad de México: 'Domingo 8/9 11:00'"""
+    if kickoff is None:
+        return 'TBD'
+    local_dt = kickoff.astimezone(CDMX_TZ)
+    return f"{DAYS_SPANISH[local_dt.weekday()]} {local_dt.day}/{local_dt.month} {local_dt.strftime('%H:%M')}"
+
+
+def format_start_time_short(kickoff):
+    """Etiqueta corta en hora de Ciudad de México: 'Dom 08/09 11:00 AM'"""
+    if kickoff is None:
+        return 'TBD'
+    local_dt = kickoff.astimezone(CDMX_TZ)
+    return f"{DAYS_SPANISH_SHORT[local_dt.weekday()]} {local_dt.strftime('%d/%m')} {local_dt.strftime('%I:%M %p')}"
+
+
+class _RecordMapping(Mapping):
+    """
+    Vista de solo lectura tipo dict sobre los campos de un dataclass.
+    Permite seguir usando game['id'], game.get('status') y `is mapping` en los templates.
+    """
+
+    __slots__ = ()
+    _keys: ClassVar[tuple] = ()
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def to_dict(self):
+        """Copia como dict simple (para JSON)"""
+        return {key: value.to_dict() if isinstance(value, _RecordMapping) else value
+                for key, value in self.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class TeamRecord(_RecordMapping):
+    name: str
+    abbreviation: str
+
+
+@dataclass(frozen=True, slots=True)
+class GameRecord(_RecordMapping):
+    """Juego de una semana; inmutable y compartido entre requests"""
+    id: str
+    name: str
+    date: str
+    kickoff: Optional[datetime]
+    start_time: str
+    start_time_short: str
+    status: str
+    clock: str
+    period: int
+    completed: bool
+    week: int
+    home_team: TeamRecord
+    home_logo: str
+    home_score: int
+    away_team: TeamRecord
+    away_logo: str
+    away_score: int
+
+    @classmethod
+    def create(cls, id, name, date, status, clock, period, completed, week,
+               home_name, home_abbr, home_logo, home_score,
+               away_name, away_abbr, away_logo, away_score):
+        """Construye el registro calculando una sola vez la hora de inicio y sus etiquetas"""
+        kickoff = parse_kickoff(date)
+        return cls(
+            id=str(id),
+            name=name or '',
+            date=date or '',
+            kickoff=kickoff,
+            start_time=format_start_time(kickoff),
+            start_time_short=format_start_time_short(kickoff),
+            status=status,
+            clock=clock or '',
+            period=period or 0,
+            completed=bool(completed),
+            week=week,
+            home_team=TeamRecord(home_name, home_abbr),
+            home_logo=home_logo or '',
+            home_score=home_score,
+            away_team=TeamRecord(away_name, away_abbr),
+            away_logo=away_logo or '',
+            away_score=away_score,
+        )
+
+
+TeamRecord._keys = tuple(f.name for f in fields(TeamRecord))
+GameRecord._keys = tuple(f.name for f in fields(GameRecord))
+
+
+def game_to_row(game, season, seasontype=SEASON_TYPE_REGULAR, slot=None):
+    """Convierte un GameRecord en los campos de la tabla games"""
+    kickoff = game.kickoff.replace(tzinfo=None) if game.kickoff else None
+    return {
+        'espn_id': game.id,
+        'season': season,
+        'season_type': seasontype,
+        'week': game.week,
+        'slot': slot,
+        'name': game.name,
+        'kickoff': kickoff,
+        'home_team': game.home_team.abbreviation,
+        'home_name': game.home_team.name,
+        'home_logo': game.home_logo,
+        'home_score': game.home_score,
+        'away_team': game.away_team.abbreviation,
+        'away_name': game.away_team.name,
+        'away_logo': game.away_logo,
+        'away_score': game.away_score,
+        'status': game.status,
+        'clock': game.clock,
+        'period': game.period,
+        'completed': game.completed,
+        'updated_at': datetime.now(),
+    }
+
+
+def row_to_game(row):
+    """Convierte un registro de games en GameRecord"""
+    game_date = row.kickoff.strftime('%Y-%m-%dT%H:%MZ') if row.kickoff else ''
+    return GameRecord.create(
+        id=row.espn_id,
+        name=row.name,
+        date=game_date,
+        status=row.status,
+        clock=row.clock,
+        period=row.period,
+        completed=row.completed,
+        week=row.week,
+        home_name=row.home_name,
+        home_abbr=row.home_team,
+        home_logo=row.home_logo,
+        home_score=row.home_score,
+        away_name=row.away_name,
+        away_abbr=row.away_team,
+        away_logo=row.away_logo,
+        away_score=row.away_score,
+    )
+
+
+def assign_slots(games, season, seasontype=SEASON_TYPE_REGULAR):
+    """
+    Slot estable por juego dentro de su semana: los juegos ya guardados conservan
+    el suyo y los nuevos toman el siguiente libre (en orden de inicio).
+    El slot es la posición del bit del juego en las máscaras de picks.
+    """
+    weeks = {game.week for game in games}
+    existing = {}
+    used = {week: set() for week in weeks}
+    for row in (Game
+                .select(Game.espn_id, Game.week, Game.slot)
+                .where((Game.season == season) &
+                       (Game.season_type == seasontype) &
+                       (Game.week.in_(list(weeks))) &
+                       Game.slot.is_null(False))):
+        existing[row.espn_id] = row.slot
+        used[row.week].add(row.slot)
+
+    slots = {}
+    no_kickoff = datetime.max.replace(tzinfo=timezone.utc)
+    for game in sorted(games, key=lambda game: (game.kickoff or no_kickoff, game.id)):
+        if game.id in existing:
+            slots[game.id] = existing[game.id]
+            continue
+        slot = 0
+        while slot in used[game.week]:
+            slot += 1
+        used[game.week].add(slot)
+        slots[game.id] = slot
+    return slots
+
+
+def upsert_games(games, season, seasontype=SEASON_TYPE_REGULAR):
+    """Inserta o actualiza los juegos de una semana en una sola sentencia"""
+    games = [game for game in games if game.id]
+    if not games:
+        return 0
+    slots = assign_slots(games, season, seasontype)
+    rows = [game_to_row(game, season, seasontype, slots[game.id]) for game in games]
+
+    with database.atomic():
+        (Game
+         .insert_many(rows)
+         .on_conflict(
+             conflict_target=[Game.espn_id],
+             preserve=[
+                 Game.season, Game.season_type, Game.week, Game.slot, Game.name, Game.kickoff,
+                 Game.home_team, Game.home_name, Game.home_logo, Game.home_score,
+                 Game.away_team, Game.away_name, Game.away_logo, Game.away_score,
+                 Game.status, Game.clock, Game.period, Game.completed, Game.updated_at
+             ])
+         .execute())
+    return len(rows)
+
+
+def get_week_games(season, week, seasontype=SEASON_TYPE_REGULAR):
+    """
+    Lee los juegos de una semana desde la base de datos.
+    Regresa (juegos, última_sincronización); la fecha es None si no hay juegos.
+    """
+    rows = list(Game
+                .select()
+                .where((Game.season == season) &
+                       (Game.week == week) &
+                       (Game.season_type == seasontype))
+                .order_by(Game.kickoff, Game.espn_id))
+
+    if not rows:
+        return [], None
+
+    return [row_to_game(row) for row in rows], max(row.updated_at for row in rows)
+
+
+def get_final_weeks(season, seasontype=SEASON_TYPE_REGULAR):
+    """Semanas ya sincronizadas en las que todos los juegos terminaron"""
+    pending = fn.SUM(Case(None, [(Game.completed == True, 0)], 1))
+    query = (Game
+             .select(Game.week, pending.alias('pending'))
+             .where((Game.season == season) & (Game.season_type == seasontype))
+             .group_by(Game.week))
+    return {row.week for row in query if row.pending == 0}
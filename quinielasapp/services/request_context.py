@@ -0,0 +1,103 @@
+"""
+Contexto del request memoizado en flask.g.
+Usuario, ligas activas, liga actual, semana actual y bloqueo de picks se
+resuelven como máximo una vez por request, sin importar cuántas funciones
+los pidan. Fuera de un request (scripts, hilos) no se debe usar.
+"""
+
+from flask import g, session
+from quinielasapp.models.models import User, League, LeagueMembership
+from quinielasapp.services.database_service import (
+    get_current_week, check_picks_deadline, get_leagues_for_user
+)
+
+_MISSING = object()
+
+
+def _memo(name, loader):
+    cache = g.setdefault('request_context', {})
+    value = cache.get(name, _MISSING)
+    if value is _MISSING:
+        value = cache[name] = loader()
+    return value
+
+
+def forget(*names):
+    """Descarta valores memoizados (después de cambiar la liga actual, la semana o el bloqueo)"""
+    cache = g.get('request_context')
+    if cache:
+        for name in names:
+            cache.pop(name, None)
+
+
+def current_user():
+    """Usuario de la sesión o None si no hay sesión o ya no existe"""
+    def load():
+        user_id = session.get('user_id')
+        if user_id is None:
+            return None
+        return User.get_or_none(User.id == user_id)
+    return _memo('user', load)
+
+
+def current_user_leagues():
+    """Ligas con membresía activa del usuario (todas si es admin)"""
+    def load():
+        user = current_user()
+        return get_leagues_for_user(user) if user else []
+    return _memo('user_leagues', load)
+
+
+def current_league():
+    """
+    Liga seleccionada en la sesión, validada contra las membresías activas del usuario.
+    Si no es válida, un usuario normal cae a su primera liga (y se guarda en la sesión);
+    un admin sin liga seleccionada se queda en None (vista general).
+    """
+    def load():
+        user = current_user()
+        if user is None:
+            return None
+
+        league_id = session.get('current_league_id')
+        league = None
+        if league_id:
+            cache = g.get('request_context', {})
+            if 'user_leagues' in cache:
+                league = next((league for league in cache['user_leagues'] if league.id == league_id), None)
+            elif user.is_admin:
+                league = League.get_or_none(League.id == league_id)
+            else:
+                league = (League.select()
+                          .join(LeagueMembership)
+                          .where((League.id == league_id) &
+                                 (LeagueMembership.user == user) &
+                                 (LeagueMembership.is_active == True))
+                          .first())
+
+        if league is None and not user.is_admin:
+            leagues = current_user_leagues()
+            league = leagues[0] if leagues else None
+            session['current_league_id'] = league.id if league else None
+        return league
+    return _memo('league', load)
+
+
+def current_league_id():
+    """
+    ID de la liga actual. Usa el de la sesión sin consultar (switch_league y home ya lo
+    validan); solo resuelve la liga si no hay una seleccionada.
+    """
+    cache = g.get('request_context', {})
+    if 'league' not in cache and session.get('current_league_id'):
+        return session['current_league_id']
+    league = current_league()
+    return league.id if league else None
+
+
+def current_week():
+    return _memo('week', get_current_week)
+
+
+def picks_locked():
+    return _memo('picks_locked', check_picks_deadline)
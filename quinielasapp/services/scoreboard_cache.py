@@ -0,0 +1,223 @@
+"""
+Caché en memoria del scoreboard de ESPN por semana.
+El tiempo de vida de cada semana depende del estado de sus juegos:
+en vivo expira en segundos, programados en minutos y terminados casi nunca.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# TTLs en segundos (configurables por variables de entorno)
+LIVE_TTL = int(os.environ.get('SCOREBOARD_LIVE_TTL', '15'))
+SCHEDULED_TTL = int(os.environ.get('SCOREBOARD_SCHEDULED_TTL', '300'))
+FINAL_TTL = int(os.environ.get('SCOREBOARD_FINAL_TTL', str(7 * 24 * 3600)))
+
+# Segundos extra que una semana sincronizada por el poller sigue vigente después
+# del siguiente ciclo, para cubrir una respuesta lenta de ESPN (timeout de 10s)
+POLL_GRACE = 15
+
+
+def _kickoff_soon(game, horizon):
+    """Indica si el juego empieza dentro de `horizon` segundos (o ya debió empezar)"""
+    kickoff = game.get('kickoff')
+    if kickoff is None:
+        return False
+    return (kickoff - datetime.now(timezone.utc)).total_seconds() <= horizon
+
+
+def ttl_for_games(games):
+    """
+    Calcula el TTL de una semana según el estado de sus juegos.
+    - Todos terminados: FINAL_TTL (prácticamente permanente)
+    - Alguno en vivo o por empezar: LIVE_TTL
+    - Todos programados: SCHEDULED_TTL
+    """
+    if not games:
+        return SCHEDULED_TTL
+
+    pending = [game for game in games if not game.get('completed', False)]
+    if not pending:
+        return FINAL_TTL
+
+    for game in pending:
+        # period > 0 significa que el juego ya arrancó
+        if game.get('period', 0) or _kickoff_soon(game, SCHEDULED_TTL):
+            return LIVE_TTL
+
+    return SCHEDULED_TTL
+
+
+class ScoreboardCache:
+    """Caché thread-safe de juegos por (temporada, tipo de temporada, semana)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _lookup(self, key, count=True):
+        """Regresa (juegos, vigente) sin copiar; (None, False) si no hay entrada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None, False
+            fresh = entry['expires_at'] > time.monotonic()
+            if count:
+                if fresh:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+            return entry['games'], fresh
+
+    def get(self, key):
+        """Regresa la lista de juegos si la entrada sigue vigente, o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires_at'] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            games = entry['games']
+        # Los GameRecord son inmutables: basta con una lista nueva por request
+        return list(games)
+
+    def get_stale(self, key, count=True):
+        """
+        Regresa (lista de juegos, vigente) aunque la entrada haya expirado.
+        Permite servir la última versión mientras se refresca en segundo plano.
+        """
+        games, fresh = self._lookup(key, count=count)
+        if games is None:
+            return None, False
+        return list(games), fresh
+
+    def set(self, key, games, ttl=None):
+        """Guarda los juegos de una semana con TTL según su estado"""
+        if ttl is None:
+            ttl = ttl_for_games(games)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = {
+                'games': tuple(games),
+                'stored_at': now,
+                'expires_at': now + ttl,
+            }
+
+    def touch(self, key, ttl):
+        """Extiende la vigencia de una entrada existente (p. ej. tras un refresco fallido)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['expires_at'] = time.monotonic() + ttl
+
+    def invalidate(self, key=None):
+        """Elimina una semana del caché (o todo si no se especifica)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Contadores de uso del caché"""
+        now = time.monotonic()
+        with self._lock:
+            served = self.hits + self.stale_hits
+            total = served + self.misses
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': (served / total * 100) if total > 0 else 0,
+                'entries': [
+                    {
+                        'season': key[0],
+                        'seasontype': key[1],
+                        'week': key[2],
+                        'games': len(entry['games']),
+                        'age_seconds': round(now - entry['stored_at'], 1),
+                        'expires_in_seconds': round(entry['expires_at'] - now, 1),
+                    }
+                    for key, entry in sorted(self._entries.items())
+                ],
+            }
+
+
+# Instancia compartida por todo el proceso
+scoreboard_cache = ScoreboardCache()
+
+
+class _Flight:
+    """Una carga en curso y su resultado"""
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescencia de cargas concurrentes por llave.
+    Si varios hilos piden la misma semana a la vez, solo el primero (líder)
+    ejecuta la carga y los demás esperan su resultado.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Ejecuta `fn` una sola vez por llave entre los hilos concurrentes.
+        Regresa (resultado, es_líder); los seguidores comparten el mismo objeto resultado.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+        return flight.result, True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+            }
+
+
+# Cargas en curso del scoreboard por (temporada, tipo de temporada, semana)
+scoreboard_flight = SingleFlight()
@@ -0,0 +1,103 @@
+"""
+Poller en segundo plano del scoreboard de ESPN.
+Mantiene la semana actual siempre fresca en la tabla games y en el caché
+para que las rutas nunca tengan que esperar a ESPN dentro de un request.
+Puede correr como hilo dentro del worker o como proceso aparte (scoreboard.py).
+"""
+
+import os
+import threading
+
+from quinielasapp.models import pooled_connection
+from quinielasapp.services.database_service import get_current_week
+from quinielasapp.services.scoreboard_cache import LIVE_TTL, SCHEDULED_TTL, POLL_GRACE, ttl_for_games
+
+
+def poll_interval_for_games(games):
+    """Intervalo de polling: rápido con juegos en vivo, lento en cualquier otro caso"""
+    return LIVE_TTL if ttl_for_games(games) == LIVE_TTL else SCHEDULED_TTL
+
+
+class ScoreboardPoller(threading.Thread):
+    """Hilo que refresca periódicamente la semana actual desde ESPN"""
+
+    def __init__(self):
+        super().__init__(name='scoreboard-poller', daemon=True)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self.current_week = None
+        self.last_error = None
+
+    def poll_once(self):
+        """Refresca la semana actual una vez y regresa el intervalo para el siguiente ciclo"""
+        from shared_utils import refresh_week_games
+
+        with pooled_connection():
+            week = get_current_week()
+        # refresh_week_games toma su propia conexión solo para guardar la semana
+        games = refresh_week_games(week, grace=POLL_GRACE)
+
+        self.current_week = week
+        self.last_error = None
+        return poll_interval_for_games(games)
+
+    def run(self):
+        print("🔄 Poller del scoreboard iniciado")
+        while not self._stop_event.is_set():
+            try:
+                interval = self.poll_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error polling scoreboard: {e}")
+                interval = LIVE_TTL
+
+            self._wake_event.wait(interval)
+            self._wake_event.clear()
+
+    def wake(self):
+        """Fuerza un refresco inmediato (p. ej. al cambiar la semana actual)"""
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def poller_enabled():
+    """Indica si este proceso corre su propio poller (si no, lo hace un proceso aparte o nadie)"""
+    return os.environ.get('SCOREBOARD_POLLER', 'True').lower() == 'true'
+
+
+def start_scoreboard_poller():
+    """Inicia el poller una sola vez por proceso si está habilitado"""
+    global _poller
+
+    if not poller_enabled():
+        return None
+
+    with _poller_lock:
+        if _poller is None or not _poller.is_alive():
+            _poller = ScoreboardPoller()
+            _poller.start()
+    return _poller
+
+
+def wake_scoreboard_poller():
+    """Pide al poller un refresco inmediato si está corriendo"""
+    if _poller is not None and _poller.is_alive():
+        _poller.wake()
+
+
+def get_poller_status():
+    """Estado del poller para diagnóstico"""
+    if _poller is None:
+        return {'running': False}
+    return {
+        'running': _poller.is_alive(),
+        'current_week': _poller.current_week,
+        'last_error': _poller.last_error,
+    }
@@ -0,0 +1,222 @@
+"""
+Motor de puntuación vectorizado con NumPy.
+Carga los picks de una liga como matriz usuarios × juegos (índice del equipo
+elegido, -1 sin pick) y la compara contra el vector de ganadores por broadcasting.
+Sirve para análisis "what-if", recalcular temporadas completas y ligas grandes.
+Sin numpy instalado, las funciones de ranking usan la ruta de weekly_scores.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+    print("⚠️ numpy no disponible; el motor vectorizado de puntuación está desactivado")
+
+from quinielasapp.models.models import User, LeagueMembership, Pick, GameResult
+
+NO_PICK = -1
+NO_RESULT = -2  # Juego sin resultado: nunca coincide con un pick
+
+
+@dataclass(frozen=True, slots=True)
+class WeekMatrix:
+    """Picks de una semana de una liga listos para calificar"""
+    week: int
+    user_ids: tuple
+    game_ids: tuple
+    teams: tuple  # Abreviatura por índice de equipo
+    picks: Any  # ndarray int16 (usuarios, juegos); NO_PICK sin pick
+    results: Any  # ndarray int16 (juegos,); NO_RESULT sin resultado
+
+
+def _require_numpy():
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError('numpy no está instalado')
+
+
+# =============================================================================
+# CALIFICACIÓN VECTORIZADA
+# =============================================================================
+
+def score_picks(picks, results):
+    """
+    Aciertos y picks hechos por usuario.
+    `picks` tiene forma (..., usuarios, juegos) y `results` (..., juegos);
+    con una dimensión de semanas al frente califica la temporada en una sola llamada.
+    """
+    _require_numpy()
+    picked = picks != NO_PICK
+    correct = (picks == results[..., np.newaxis, :]) & picked
+    return correct.sum(axis=-1), picked.sum(axis=-1)
+
+
+def rank_scores(correct):
+    """Ranking de competencia (1, 2, 2, 4): 1 + número de usuarios con más aciertos"""
+    _require_numpy()
+    descending = -np.sort(correct)[::-1]
+    return np.searchsorted(descending, -correct, side='left') + 1
+
+
+def tie_groups(correct):
+    """[(puntuación, índices de usuarios)] de mayor a menor; más de un índice es empate"""
+    _require_numpy()
+    order = np.argsort(-correct, kind='stable')
+    boundaries = np.flatnonzero(np.diff(correct[order])) + 1
+    return [(int(correct[group[0]]), group) for group in np.split(order, boundaries) if len(group)]
+
+
+# =============================================================================
+# CARGA DESDE LA BASE DE DATOS
+# =============================================================================
+
+def load_week_matrix(league_id, week):
+    """Construye la matriz de picks de los miembros activos de una liga (dos consultas)"""
+    _require_numpy()
+
+    pick_rows = list(Pick
+                     .select(Pick.user, Pick.game_id, Pick.selection_abbr)
+                     .join(LeagueMembership, on=((LeagueMembership.user == Pick.user) &
+                                                 (LeagueMembership.league == Pick.league)))
+                     .where((Pick.league == league_id) &
+                            (Pick.week == week) &
+                            (LeagueMembership.is_active == True))
+                     .tuples())
+    result_rows = list(GameResult
+                       .select(GameResult.game_id, GameResult.winner)
+                       .where(GameResult.week == week)
+                       .tuples())
+
+    user_ids = tuple(sorted({user_id for user_id, _, _ in pick_rows}))
+    game_ids = tuple(sorted({game_id for _, game_id, _ in pick_rows} |
+                            {game_id for game_id, _ in result_rows}))
+    teams = tuple(sorted({abbr for _, _, abbr in pick_rows if abbr} |
+                         {winner for _, winner in result_rows if winner}))
+
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    game_index = {game_id: i for i, game_id in enumerate(game_ids)}
+    team_index = {team: i for i, team in enumerate(teams)}
+
+    picks = np.full((len(user_ids), len(game_ids)), NO_PICK, dtype=np.int16)
+    rows = [(user_index[user_id], game_index[game_id], team_index[abbr])
+            for user_id, game_id, abbr in pick_rows if abbr]
+    if rows:
+        u, g, t = np.array(rows, dtype=np.int32).T
+        picks[u, g] = t
+
+    results = np.full(len(game_ids), NO_RESULT, dtype=np.int16)
+    for game_id, winner in result_rows:
+        if winner:
+            results[game_index[game_id]] = team_index[winner]
+
+    return WeekMatrix(week, user_ids, game_ids, teams, picks, results)
+
+
+def with_outcomes(matrix, outcomes):
+    """
+    Vector de resultados hipotético: `outcomes` = {game_id: abreviatura ganadora}.
+    Equipos que nadie eligió simplemente no suman aciertos.
+    """
+    _require_numpy()
+    results = matrix.results.copy()
+    for game_id, winner in outcomes.items():
+        if game_id in matrix.game_ids:
+            results[matrix.game_ids.index(game_id)] = (
+                matrix.teams.index(winner) if winner in matrix.teams else NO_RESULT
+            )
+    return results
+
+
+def stack_weeks(matrices):
+    """
+    Apila varias semanas en arreglos (semanas, usuarios, juegos) y (semanas, juegos)
+    sobre la unión de usuarios; los huecos quedan como NO_PICK / NO_RESULT.
+    """
+    _require_numpy()
+    user_ids = tuple(sorted(set().union(*(matrix.user_ids for matrix in matrices))))
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    max_games = max((len(matrix.game_ids) for matrix in matrices), default=0)
+
+    picks = np.full((len(matrices), len(user_ids), max_games), NO_PICK, dtype=np.int16)
+    results = np.full((len(matrices), max_games), NO_RESULT, dtype=np.int16)
+    for w, matrix in enumerate(matrices):
+        rows = [user_index[user_id] for user_id in matrix.user_ids]
+        games = len(matrix.game_ids)
+        picks[w, rows, :games] = matrix.picks
+        results[w, :games] = matrix.results
+
+    return user_ids, picks, results
+
+
+def score_season(league_id, weeks):
+    """
+    Recalcula varias semanas de una liga en una sola llamada vectorizada.
+    Regresa (user_ids, aciertos por semana [semanas × usuarios], total, ranking).
+    """
+    user_ids, picks, results = stack_weeks([load_week_matrix(league_id, week) for week in weeks])
+    weekly_correct, _ = score_picks(picks, results)
+    season_correct = weekly_correct.sum(axis=0)
+    return user_ids, weekly_correct, season_correct, rank_scores(season_correct)
+
+
+# =============================================================================
+# MISMA INTERFAZ QUE database_service.get_user_standings_by_league
+# =============================================================================
+
+def standings_from_matrix(matrix, results=None):
+    """Convierte la calificación de una matriz al formato de standings_partial.html"""
+    correct, total = score_picks(matrix.picks, matrix.results if results is None else results)
+    ranks = rank_scores(correct)
+
+    users = {user.id: user for user in User
+             .select(User.id, User.username, User.first_name, User.last_name)
+             .where(User.id.in_(list(matrix.user_ids)))} if matrix.user_ids else {}
+
+    standings_data = []
+    for i in np.lexsort((np.array(matrix.user_ids), -correct)):
+        user = users[matrix.user_ids[i]]
+        correct_picks = int(correct[i])
+        total_picks = int(total[i])
+        if total_picks == 0:
+            continue
+        standings_data.append({
+            'user_id': user.id,
+            'username': user.username,
+            'nombre': user.first_name or '',
+            'apellido': user.last_name or '',
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'correct_picks': correct_picks,
+            'total_picks': total_picks,
+            'percentage': correct_picks / total_picks * 100,
+            'total_score': correct_picks,
+            'score': correct_picks,
+            'rank': int(ranks[i]),
+        })
+    return standings_data
+
+
+def get_user_standings_by_league(league_id, week=None, outcomes=None):
+    """
+    Ranking de una liga calculado con el motor vectorizado.
+    `outcomes` permite simular resultados ({game_id: abreviatura}).
+    Sin numpy (y sin simulación) regresa el ranking de weekly_scores.
+    """
+    from quinielasapp.services.database_service import get_current_week
+    from quinielasapp.services.scoring_service import get_weekly_standings
+
+    if week is None:
+        week = get_current_week()
+
+    if not NUMPY_AVAILABLE:
+        if outcomes:
+            _require_numpy()
+        return get_weekly_standings(week, league_id=league_id)
+
+    matrix = load_week_matrix(league_id, week)
+    results = with_outcomes(matrix, outcomes) if outcomes else None
+    return standings_from_matrix(matrix, results)
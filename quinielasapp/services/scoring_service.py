@@ -0,0 +1,818 @@
+"""
+Calificación de picks y puntuación semanal precalculada.
+- picks.is_correct se marca con un UPDATE por lote de juegos cuando se registra,
+  corrige o revierte un resultado.
+- weekly_scores guarda los aciertos y picks de un usuario en una liga y semana;
+  se recalcula solo para los usuarios afectados.
+- Máscaras de bits por usuario y semana (bit = Game.slot): juegos con pick y picks
+  al equipo local. Con las máscaras de resultados de la semana, los aciertos son
+  popcount(~(picks ^ resultados) & elegidos & decididos).
+- cumulative_scores es la suma prefija de weekly_scores por usuario y liga;
+  al cambiar una semana se reescriben solo las filas de esa semana en adelante.
+- Clasificación de temporada por liga con funciones de ventana sobre weekly_scores,
+  cacheada por liga hasta que cambia la versión de resultados (results_version).
+"""
+
+import operator
+import os
+import threading
+import time
+from datetime import datetime
+from functools import reduce
+from peewee import fn, Case, EXCLUDED, Expression, JOIN, Select, SQL, Tuple, Value
+from quinielasapp.models.models import User, League, LeagueMembership, Pick, GameResult, Game, WeeklyScore, CumulativeScore, WinnersHistory, SystemConfig
+from quinielasapp.models import database, pooled_connection
+from quinielasapp.services.game_events import GAME_FINAL, subscribe
+from quinielasapp.services.games_service import nfl_season, season_bounds
+
+
+# PostgreSQL: en RETURNING, xmax = 0 solo en filas recién insertadas (no en las actualizadas)
+INSERTED_ROW = SQL('(xmax = 0)')
+
+# Columnas de game_results que vienen del scoreboard
+RESULT_COLUMNS = (GameResult.home_team, GameResult.away_team,
+                  GameResult.home_score, GameResult.away_score, GameResult.winner)
+
+
+def current_season():
+    """Temporada en curso (misma convención que el scoreboard)"""
+    return nfl_season()
+
+
+def picks_in_season(pick_model, season):
+    """
+    Condición para quedarse con los picks de una temporada: los de juegos de esa temporada
+    en la tabla games o, si el juego aún no está sincronizado, los hechos durante ella.
+    Pick no guarda la temporada y los números de semana se repiten cada año.
+    """
+    start, end = season_bounds(season)
+    SeasonGame = Game.alias()
+    SyncedGame = Game.alias()
+    return (pick_model.game_id.in_(SeasonGame.select(SeasonGame.espn_id).where(SeasonGame.season == season)) |
+            (pick_model.game_id.not_in(SyncedGame.select(SyncedGame.espn_id)) &
+             (pick_model.created_at >= start) & (pick_model.created_at < end)))
+
+
+def mark_pick_results(week, game_ids=None, league_id=None, user_id=None):
+    """
+    Marca is_correct comparando cada pick con el ganador en game_results
+    (un solo UPDATE ... FROM). Los picks de juegos sin resultado no se tocan.
+    """
+    query = (Pick
+             .update(is_correct=fn.COALESCE(Pick.selection_abbr == GameResult.winner, False))
+             .from_(GameResult)
+             .where((GameResult.game_id == Pick.game_id) &
+                    (GameResult.week == Pick.week) &
+                    (Pick.week == week)))
+    if game_ids is not None:
+        game_ids = [str(game_id) for game_id in game_ids]
+        if not game_ids:
+            return 0
+        query = query.where(Pick.game_id.in_(game_ids))
+    if league_id is not None:
+        query = query.where(Pick.league == league_id)
+    if user_id is not None:
+        query = query.where(Pick.user == user_id)
+    return query.execute()
+
+
+def clear_pick_results(week, game_ids):
+    """Regresa a pendiente (NULL) los picks de juegos cuyo resultado se revirtió"""
+    game_ids = [str(game_id) for game_id in game_ids]
+    if not game_ids:
+        return 0
+    return (Pick
+            .update(is_correct=None)
+            .where((Pick.week == week) & Pick.game_id.in_(game_ids))
+            .execute())
+
+
+def apply_game_results(week, game_ids):
+    """Después de registrar o corregir resultados: califica los picks y actualiza weekly_scores"""
+    with database.atomic():
+        mark_pick_results(week, game_ids=game_ids)
+        refresh_weekly_scores(week, game_ids=game_ids)
+        refresh_cumulative_scores(week, game_ids=game_ids)
+        bump_results_version()
+
+
+def game_result_row(game_id, home_team, away_team, home_score, away_score):
+    """Fila de game_results de un juego terminado; el ganador sale del marcador"""
+    if home_score > away_score:
+        winner = home_team
+    elif away_score > home_score:
+        winner = away_team
+    else:
+        winner = 'TIE'  # Empate (raro en NFL pero posible)
+    return {
+        'game_id': game_id,
+        'home_team': home_team,
+        'away_team': away_team,
+        'home_score': home_score,
+        'away_score': away_score,
+        'winner': winner
+    }
+
+
+def upsert_game_results(week, results):
+    """
+    Guarda los resultados de una semana en una sola sentencia:
+    INSERT ... ON CONFLICT (week, game_id) DO UPDATE ... WHERE algo cambió.
+    Las filas sin cambios no se escriben ni se regresan; RETURNING (xmax = 0) separa
+    insertadas de actualizadas. En la misma transacción califica los picks de esos
+    juegos y actualiza weekly_scores y cumulative_scores (apply_game_results).
+    `results` = [{'game_id', 'home_team', 'away_team', 'home_score', 'away_score', 'winner'}].
+    Regresa (game_ids insertados, game_ids actualizados).
+    """
+    now = datetime.now()
+    rows = {}
+    for result in results:
+        # Un juego repetido en el lote haría que ON CONFLICT toque la misma fila dos veces
+        rows[str(result['game_id'])] = {**result, 'game_id': str(result['game_id']),
+                                        'week': week, 'updated_at': now}
+    if not rows:
+        return [], []
+
+    changed = reduce(operator.or_, [
+        Expression(column, 'IS DISTINCT FROM', getattr(EXCLUDED, column.column_name))
+        for column in RESULT_COLUMNS
+    ])
+    query = (GameResult
+             .insert_many(list(rows.values()))
+             .on_conflict(conflict_target=[GameResult.week, GameResult.game_id],
+                          update={column: getattr(EXCLUDED, column.column_name)
+                                  for column in RESULT_COLUMNS + (GameResult.updated_at,)},
+                          where=changed)
+             .returning(GameResult.game_id, INSERTED_ROW.alias('inserted'))
+             .tuples())
+
+    with database.atomic():
+        written = list(query.execute())
+        if written:
+            apply_game_results(week, [game_id for game_id, _ in written])
+
+    inserted = [game_id for game_id, was_inserted in written if was_inserted]
+    updated = [game_id for game_id, was_inserted in written if not was_inserted]
+    return inserted, updated
+
+
+def record_final_games(events):
+    """
+    Consumidor de game_events: cuando el scoreboard marca un juego como final
+    registra su resultado con el marcador ya guardado en la tabla games.
+    upsert_game_results califica los picks y actualiza las puntuaciones en la misma transacción.
+    """
+    finals = {}
+    for event in events:
+        if event.type == GAME_FINAL:
+            finals.setdefault(event.week, []).append(event.game_id)
+    if not finals:
+        return
+
+    with pooled_connection():
+        for week, game_ids in finals.items():
+            games = (Game
+                     .select(Game.espn_id, Game.home_team, Game.away_team, Game.home_score, Game.away_score)
+                     .where((Game.week == week) & Game.espn_id.in_(game_ids) & (Game.completed == True)))
+            results = [game_result_row(game.espn_id, game.home_team, game.away_team,
+                                       game.home_score, game.away_score)
+                       for game in games]
+            inserted, updated = upsert_game_results(week, results)
+            if inserted or updated:
+                print(f"🏁 Semana {week}: {len(inserted)} resultados nuevos, {len(updated)} actualizados")
+
+
+def start_result_listener():
+    """Registra record_final_games si está habilitado (una vez por proceso)"""
+    if os.environ.get('SCOREBOARD_AUTO_RESULTS', 'True').lower() != 'true':
+        return None
+    return subscribe(record_final_games)
+
+
+def revert_game_results(week, game_ids):
+    """Elimina resultados registrados y deja los picks de esos juegos como pendientes"""
+    game_ids = [str(game_id) for game_id in game_ids]
+    with database.atomic():
+        deleted = (GameResult
+                   .delete()
+                   .where((GameResult.week == week) & GameResult.game_id.in_(game_ids))
+                   .execute())
+        clear_pick_results(week, game_ids)
+        refresh_weekly_scores(week, game_ids=game_ids)
+        refresh_cumulative_scores(week, game_ids=game_ids)
+        bump_results_version()
+    return deleted
+
+
+def apply_user_picks(week, league_id, user_id):
+    """
+    Después de guardar picks: califica los que ya tienen resultado y actualiza la fila semanal.
+    Los picks cambian totales y participantes de la clasificación, así que también se invalida.
+    """
+    with database.atomic():
+        mark_pick_results(week, league_id=league_id, user_id=user_id)
+        refresh_weekly_scores(week, league_id=league_id, user_id=user_id)
+        refresh_cumulative_scores(week, league_id=league_id, user_id=user_id)
+        bump_results_version()
+
+
+def affected_members(week, game_ids=None, league_id=None, user_id=None, season=None):
+    """
+    Subconsulta (league_id, user_id) de quienes tienen picks en la semana de la temporada
+    (solo de `game_ids` si se indica). None si `game_ids` viene vacío.
+    """
+    season = season or current_season()
+    AffectedPick = Pick.alias()
+    affected = (AffectedPick
+                .select(AffectedPick.league, AffectedPick.user)
+                .where((AffectedPick.week == week) & picks_in_season(AffectedPick, season)))
+    if game_ids is not None:
+        game_ids = [str(game_id) for game_id in game_ids]
+        if not game_ids:
+            return None
+        affected = affected.where(AffectedPick.game_id.in_(game_ids))
+    if league_id is not None:
+        affected = affected.where(AffectedPick.league == league_id)
+    if user_id is not None:
+        affected = affected.where(AffectedPick.user == user_id)
+    return affected.distinct()
+
+
+def refresh_weekly_scores(week, game_ids=None, league_id=None, user_id=None, season=None):
+    """
+    Recalcula weekly_scores de una semana en dos sentencias:
+    1. Crea las filas faltantes de los usuarios afectados.
+    2. Agrega sus picks (aciertos según is_correct, total y máscaras de bits)
+       y lo aplica con un UPDATE ... FROM.
+    Los usuarios afectados son los que eligieron alguno de `game_ids`
+    (o todos los de la semana), opcionalmente filtrados por liga/usuario.
+    Regresa el número de filas actualizadas.
+    """
+    season = season or current_season()
+    now = datetime.now()
+    start, end = season_bounds(season)
+
+    affected = affected_members(week, game_ids, league_id, user_id, season=season)
+    if affected is None:
+        return 0
+
+    # La temporada sale del juego; sin juego sincronizado, de la fecha del pick
+    in_season = ((Game.season == season) |
+                 (Game.id.is_null() & (Pick.created_at >= start) & (Pick.created_at < end)))
+
+    # Cada juego tiene un slot distinto en la semana, así que SUM de los bits equivale a OR.
+    # Solo entran a las máscaras los picks a uno de los dos equipos del juego: una selección
+    # que no coincide (p. ej. nombre completo antiguo) no se puede tomar como pick de visitante
+    bit = Expression(Value(1), '<<', Game.slot)
+    team_pick = (((Pick.selection_abbr == Game.home_team) | (Pick.selection_abbr == Game.away_team)) &
+                 Game.slot.is_null(False))
+    totals = (Pick
+              .select(Pick.league, Pick.user,
+                      fn.SUM(Case(None, [(Pick.is_correct == True, 1)], 0)).alias('correct'),
+                      fn.COUNT(Pick.id).alias('total'),
+                      fn.SUM(Case(None, [(team_pick, bit)], 0)).alias('picked_mask'),
+                      fn.SUM(Case(None, [((Pick.selection_abbr == Game.home_team) & Game.slot.is_null(False), bit)], 0))
+                      .alias('home_mask'))
+              .join(Game, JOIN.LEFT_OUTER, on=(Game.espn_id == Pick.game_id))
+              .where((Pick.week == week) & in_season & Tuple(Pick.league, Pick.user).in_(affected))
+              .group_by(Pick.league, Pick.user)
+              .alias('totals'))
+
+    with database.atomic():
+        (WeeklyScore
+         .insert_from(
+             affected.select_extend(Value(season), Value(week), Value(0), Value(0),
+                                    Value(0), Value(0), Value(now)),
+             fields=[WeeklyScore.league, WeeklyScore.user, WeeklyScore.season, WeeklyScore.week,
+                     WeeklyScore.correct, WeeklyScore.total,
+                     WeeklyScore.picked_mask, WeeklyScore.home_mask, WeeklyScore.updated_at])
+         .on_conflict_ignore()
+         .execute())
+
+        return (WeeklyScore
+                .update(correct=totals.c.correct, total=totals.c.total,
+                        picked_mask=totals.c.picked_mask, home_mask=totals.c.home_mask,
+                        updated_at=now)
+                .from_(totals)
+                .where((WeeklyScore.league == totals.c.league_id) &
+                       (WeeklyScore.user == totals.c.user_id) &
+                       (WeeklyScore.season == season) &
+                       (WeeklyScore.week == week))
+                .execute())
+
+
+def refresh_cumulative_scores(week, game_ids=None, league_id=None, user_id=None, season=None):
+    """
+    Reescribe la suma prefija de los usuarios afectados desde `week` en adelante:
+    borra sus filas con semana >= week y las vuelve a insertar desde weekly_scores con
+    SUM(...) OVER (PARTITION BY liga, usuario ORDER BY semana). Las semanas anteriores
+    no cambian, así que no se tocan. Regresa el número de filas insertadas.
+    """
+    season = season or current_season()
+
+    affected = affected_members(week, game_ids, league_id, user_id, season=season)
+    if affected is None:
+        return 0
+    members = Tuple(WeeklyScore.league, WeeklyScore.user).in_(affected)
+
+    running = (WeeklyScore
+               .select(WeeklyScore.league, WeeklyScore.user, WeeklyScore.week,
+                       fn.SUM(WeeklyScore.correct).over(partition_by=[WeeklyScore.league, WeeklyScore.user],
+                                                        order_by=[WeeklyScore.week]).alias('correct'),
+                       fn.SUM(WeeklyScore.total).over(partition_by=[WeeklyScore.league, WeeklyScore.user],
+                                                      order_by=[WeeklyScore.week]).alias('total'))
+               .where((WeeklyScore.season == season) & members)
+               .alias('running'))
+
+    with database.atomic():
+        (CumulativeScore
+         .delete()
+         .where((CumulativeScore.season == season) &
+                (CumulativeScore.week >= week) &
+                Tuple(CumulativeScore.league, CumulativeScore.user).in_(affected))
+         .execute())
+
+        return (CumulativeScore
+                .insert_from(
+                    Select([running], [running.c.league_id, running.c.user_id, Value(season),
+                                       running.c.week, running.c.correct, running.c.total,
+                                       Value(datetime.now())])
+                    .where(running.c.week >= week),
+                    fields=[CumulativeScore.league, CumulativeScore.user, CumulativeScore.season,
+                            CumulativeScore.week, CumulativeScore.correct, CumulativeScore.total,
+                            CumulativeScore.updated_at])
+                .execute())
+
+
+def get_standings_as_of(as_of_week, league_id, season=None):
+    """
+    Ranking acumulado de una liga hasta `as_of_week` leído de cumulative_scores:
+    por usuario, la fila de la última semana jugada <= as_of_week (subconsulta
+    correlacionada sobre el índice único). Mismo formato que get_weekly_standings.
+    """
+    season = season or current_season()
+
+    Latest = CumulativeScore.alias()
+    latest_week = (Latest
+                   .select(fn.MAX(Latest.week))
+                   .where((Latest.league == CumulativeScore.league) &
+                          (Latest.season == CumulativeScore.season) &
+                          (Latest.user == CumulativeScore.user) &
+                          (Latest.week <= as_of_week)))
+
+    query = (CumulativeScore
+             .select(CumulativeScore.correct, CumulativeScore.total,
+                     User.id.alias('user_id'), User.username, User.first_name, User.last_name)
+             .join(User, on=(CumulativeScore.user == User.id))
+             .switch(CumulativeScore)
+             .join(LeagueMembership, on=((LeagueMembership.league == CumulativeScore.league) &
+                                         (LeagueMembership.user == CumulativeScore.user)))
+             .where((CumulativeScore.league == league_id) &
+                    (CumulativeScore.season == season) &
+                    (CumulativeScore.week == latest_week) &
+                    (CumulativeScore.total > 0) &
+                    (LeagueMembership.is_active == True))
+             .order_by(CumulativeScore.correct.desc(), User.id)
+             .dicts())
+
+    standings_data = []
+    for row in query:
+        correct_picks = row['correct']
+        total_picks = row['total']
+        standings_data.append({
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'nombre': row['first_name'] or '',
+            'apellido': row['last_name'] or '',
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'correct_picks': correct_picks,
+            'total_picks': total_picks,
+            'percentage': (correct_picks / total_picks * 100) if total_picks > 0 else 0,
+            'total_score': correct_picks,
+            'score': correct_picks,
+            'league_id': league_id,
+        })
+    return standings_data
+
+
+# =============================================================================
+# MÁSCARAS DE BITS
+# =============================================================================
+
+def get_results_masks(week, season=None):
+    """
+    Máscaras de resultados de una semana: (decididos, empates, ganó el local).
+    Un juego con resultado pero sin slot (no sincronizado) no entra en las máscaras.
+    """
+    season = season or current_season()
+    decided = ties = home_wins = 0
+    query = (GameResult
+             .select(GameResult.winner, Game.slot, Game.home_team)
+             .join(Game, on=(Game.espn_id == GameResult.game_id))
+             .where((GameResult.week == week) &
+                    (Game.season == season) &
+                    Game.slot.is_null(False))
+             .tuples())
+    for winner, slot, home_team in query:
+        bit = 1 << slot
+        decided |= bit
+        if winner == 'TIE':
+            ties |= bit
+        elif winner == home_team:
+            home_wins |= bit
+    return decided, ties, home_wins
+
+
+def count_mask_results(picked_mask, home_mask, results_masks):
+    """(aciertos, fallos, pendientes) de una semana a partir de las máscaras"""
+    decided, ties, home_wins = results_masks
+    scorable = picked_mask & decided & ~ties
+    correct = (~(home_mask ^ home_wins) & scorable).bit_count()
+    graded = (picked_mask & decided).bit_count()
+    return correct, graded - correct, picked_mask.bit_count() - graded
+
+
+def get_pick_masks(week, user_id, season=None):
+    """
+    {league_id: (total, correct, picked_mask, home_mask)} de un usuario en la semana.
+    `total` y `correct` cuentan todos los picks (igual que la clasificación); las máscaras solo
+    los picks a un equipo de juegos con slot en la tabla games, así que quedan para el detalle por juego.
+    """
+    season = season or current_season()
+    query = (WeeklyScore
+             .select(WeeklyScore.league, WeeklyScore.total, WeeklyScore.correct,
+                     WeeklyScore.picked_mask, WeeklyScore.home_mask)
+             .where((WeeklyScore.user == user_id) &
+                    (WeeklyScore.season == season) &
+                    (WeeklyScore.week == week))
+             .tuples())
+    return {league_id: (total, correct, picked_mask, home_mask)
+            for league_id, total, correct, picked_mask, home_mask in query}
+
+
+def get_users_with_picks(week, season=None):
+    """IDs de usuarios con al menos un pick en la semana (en cualquier liga)"""
+    season = season or current_season()
+    query = (WeeklyScore
+             .select(WeeklyScore.user)
+             .where((WeeklyScore.season == season) &
+                    (WeeklyScore.week == week) &
+                    (WeeklyScore.total > 0))
+             .distinct()
+             .tuples())
+    return {user_id for user_id, in query}
+
+
+def rebuild_weekly_scores(season=None):
+    """
+    Califica los picks y recalcula weekly_scores y cumulative_scores de todas las semanas
+    con picks (migración inicial o reparación); en orden ascendente para que cada
+    suma prefija lea semanas anteriores ya recalculadas.
+    """
+    weeks = [row.week for row in Pick.select(Pick.week).distinct().order_by(Pick.week)]
+    for week in weeks:
+        with database.atomic():
+            mark_pick_results(week)
+            refresh_weekly_scores(week, season=season)
+            refresh_cumulative_scores(week, season=season)
+    bump_results_version()
+    return weeks
+
+
+def get_weekly_standings(week, league_id=None, season=None):
+    """
+    Ranking de una semana leído de weekly_scores.
+    Sin league_id regresa todas las ligas activas, ordenadas por liga y puntuación.
+    Cada fila tiene el formato de standings_partial.html más league_id/league_name/league_code.
+    """
+    season = season or current_season()
+
+    query = (WeeklyScore
+             .select(WeeklyScore.correct, WeeklyScore.total,
+                     User.id.alias('user_id'), User.username, User.first_name, User.last_name,
+                     League.id.alias('league_id'), League.name.alias('league_name'),
+                     League.code.alias('league_code'))
+             .join(User, on=(WeeklyScore.user == User.id))
+             .switch(WeeklyScore)
+             .join(League, on=(WeeklyScore.league == League.id))
+             .join(LeagueMembership, on=((LeagueMembership.league == WeeklyScore.league) &
+                                         (LeagueMembership.user == WeeklyScore.user)))
+             .where((WeeklyScore.season == season) &
+                    (WeeklyScore.week == week) &
+                    (WeeklyScore.total > 0) &
+                    (LeagueMembership.is_active == True)))
+
+    if league_id is not None:
+        query = query.where(WeeklyScore.league == league_id)
+    else:
+        query = query.where(League.is_active == True)
+
+    query = query.order_by(League.name, WeeklyScore.correct.desc(), User.id).dicts()
+
+    standings_data = []
+    for row in query:
+        correct_picks = row['correct']
+        total_picks = row['total']
+        percentage = (correct_picks / total_picks * 100) if total_picks > 0 else 0
+
+        standings_data.append({
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'nombre': row['first_name'] or '',
+            'apellido': row['last_name'] or '',
+            'first_name': row['first_name'],  # Para compatibilidad con template
+            'last_name': row['last_name'],    # Para compatibilidad con template
+            'correct_picks': correct_picks,
+            'total_picks': total_picks,
+            'percentage': percentage,
+            'total_score': correct_picks,  # Para admin modal
+            'score': correct_picks,  # Para template standings_partial.html
+            'league_id': row['league_id'],
+            'league_name': row['league_name'],
+            'league_code': row['league_code'],
+        })
+
+    return standings_data
+
+
+STANDINGS_PAGE_SIZE = 50
+
+
+def get_overall_standings(league_id=None, season=None, after=None, limit=STANDINGS_PAGE_SIZE):
+    """
+    Ranking general (admin) de usuarios no-admin en una sola consulta agrupada
+    sobre weekly_scores, opcionalmente filtrado por liga y temporada.
+    Paginación por keyset: `after` = (aciertos, user_id) de la última fila de la
+    página anterior; orden aciertos DESC, user_id ASC.
+    Regresa (filas, cursor de la siguiente página o None).
+    """
+    correct = fn.SUM(WeeklyScore.correct)
+    total = fn.SUM(WeeklyScore.total)
+
+    query = (WeeklyScore
+             .select(User.id.alias('user_id'), User.username, User.first_name, User.last_name,
+                     correct.alias('correct'), total.alias('total'))
+             .join(User, on=(WeeklyScore.user == User.id))
+             .where(User.is_admin == False)
+             .group_by(User.id, User.username, User.first_name, User.last_name)
+             .having(total > 0))
+
+    if league_id is not None:
+        query = query.where(WeeklyScore.league == league_id)
+    if season is not None:
+        query = query.where(WeeklyScore.season == season)
+    if after is not None:
+        after_score, after_id = after
+        query = query.having((correct < after_score) |
+                             ((correct == after_score) & (User.id > after_id)))
+
+    rows = list(query.order_by(correct.desc(), User.id).limit(limit + 1).dicts())
+
+    standings_data = []
+    for row in rows[:limit]:
+        correct_picks = row['correct']
+        total_picks = row['total']
+        standings_data.append({
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'nombre': row['first_name'] or '',
+            'apellido': row['last_name'] or '',
+            'total_score': correct_picks,
+            'correct_picks': correct_picks,
+            'total_picks': total_picks,
+            'percentage': (correct_picks / total_picks * 100) if total_picks > 0 else 0,
+            'score': correct_picks,  # Para compatibilidad con template
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+        })
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = standings_data[-1]
+        next_cursor = (last['score'], last['user_id'])
+    return standings_data, next_cursor
+
+
+def get_week_winners(week, season=None):
+    """
+    Ganadores de la semana en todas las ligas activas en una sola consulta:
+    MAX(correct) OVER (PARTITION BY liga) marca la puntuación máxima y
+    COUNT(*) OVER (PARTITION BY liga) sobre los que la alcanzan detecta empates.
+    Solo cuentan usuarios con al menos un acierto.
+    """
+    season = season or current_season()
+
+    scored = (WeeklyScore
+              .select(WeeklyScore.league.alias('league_id'),
+                      WeeklyScore.user.alias('user_id'),
+                      WeeklyScore.correct,
+                      User.username,
+                      League.name.alias('league_name'),
+                      fn.MAX(WeeklyScore.correct).over(partition_by=[WeeklyScore.league]).alias('max_score'))
+              .join(User, on=(WeeklyScore.user == User.id))
+              .switch(WeeklyScore)
+              .join(League, on=(WeeklyScore.league == League.id))
+              .join(LeagueMembership, on=((LeagueMembership.league == WeeklyScore.league) &
+                                          (LeagueMembership.user == WeeklyScore.user)))
+              .where((WeeklyScore.season == season) &
+                     (WeeklyScore.week == week) &
+                     (WeeklyScore.correct > 0) &
+                     (League.is_active == True) &
+                     (LeagueMembership.is_active == True))
+              .alias('scored'))
+
+    winners = (Select([scored], [
+                   scored.c.league_id, scored.c.league_name, scored.c.user_id,
+                   scored.c.username, scored.c.correct,
+                   fn.COUNT(SQL('*')).over(partition_by=[scored.c.league_id]).alias('winners_count')])
+               .where(scored.c.correct == scored.c.max_score)
+               .order_by(scored.c.league_name, scored.c.league_id, scored.c.username)
+               .bind(database)
+               .dicts())
+
+    return [{
+        'league_id': row['league_id'],
+        'league_name': row['league_name'],
+        'user_id': row['user_id'],
+        'username': row['username'],
+        'correct_picks': row['correct'],
+        'is_tie': row['winners_count'] > 1,
+    } for row in winners]
+
+
+def declare_week_winners(week, season=None):
+    """
+    Calcula y guarda los ganadores de la semana de todas las ligas:
+    una consulta, un DELETE y un INSERT dentro de una sola transacción.
+    Regresa [{'league_name', 'winners', 'max_score'}] por liga con ganador.
+    """
+    winners = get_week_winners(week, season=season)
+    if not winners:
+        return []
+
+    league_ids = sorted({winner['league_id'] for winner in winners})
+    declared_at = datetime.now()
+
+    with database.atomic():
+        (WinnersHistory
+         .delete()
+         .where((WinnersHistory.week == week) & WinnersHistory.league_id.in_(league_ids))
+         .execute())
+        WinnersHistory.insert_many([{
+            'user_id': winner['user_id'],
+            'league_id': winner['league_id'],
+            'week': week,
+            'winner_username': winner['username'],
+            'score': winner['correct_picks'],
+            'is_tie': winner['is_tie'],
+            'declared_at': declared_at,
+        } for winner in winners]).execute()
+        bump_results_version()
+
+    leagues_processed = []
+    for winner in winners:
+        if not leagues_processed or leagues_processed[-1]['league_id'] != winner['league_id']:
+            leagues_processed.append({
+                'league_id': winner['league_id'],
+                'league_name': winner['league_name'],
+                'winners': [],
+                'max_score': winner['correct_picks'],
+            })
+        leagues_processed[-1]['winners'].append(winner)
+
+    return leagues_processed
+
+
+# =============================================================================
+# CLASIFICACIÓN DE TEMPORADA
+# =============================================================================
+
+RESULTS_VERSION_KEY = 'results_version'
+
+_leaderboard_cache = {}  # (league_id, season) -> (versión de resultados, filas)
+_leaderboard_lock = threading.Lock()
+
+
+def bump_results_version():
+    """Marca que cambiaron picks, resultados o ganadores; invalida las clasificaciones cacheadas (un upsert)"""
+    version = str(time.time_ns())
+    (SystemConfig
+     .insert(config_key=RESULTS_VERSION_KEY, config_value=version, updated_at=datetime.now())
+     .on_conflict(conflict_target=[SystemConfig.config_key],
+                  update={SystemConfig.config_value: version, SystemConfig.updated_at: datetime.now()})
+     .execute())
+    SystemConfig.invalidate_cache()
+
+
+def get_results_version():
+    return SystemConfig.get_config(RESULTS_VERSION_KEY, '0')
+
+
+def get_season_leaderboard(league_id, season=None):
+    """
+    Clasificación acumulada de la temporada de una liga, cacheada en el proceso
+    por (liga, versión de resultados). Cada fila: aciertos acumulados, semanas
+    ganadas, posición y cambio de posición respecto a la semana anterior.
+    """
+    season = season or current_season()
+    version = get_results_version()
+    key = (league_id, season)
+
+    with _leaderboard_lock:
+        cached = _leaderboard_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    rows = compute_season_leaderboard(league_id, season)
+    with _leaderboard_lock:
+        _leaderboard_cache[key] = (version, rows)
+    return rows
+
+
+def compute_season_leaderboard(league_id, season):
+    """
+    Una sola consulta sobre el agregado semanal (weekly_scores):
+    - por usuario: aciertos de la temporada y los acumulados hasta la semana anterior
+      a la última calificada de la liga en la temporada (la última con picks calificados);
+    - RANK() OVER (ORDER BY acumulado) da la posición actual y la anterior
+      (esta última solo entre quienes ya tenían semanas jugadas);
+    - las semanas ganadas salen de winners_history declaradas durante la temporada
+      (season_bounds: la semana 18 se declara en enero).
+    """
+    # Solo semanas calificadas de esta temporada: los picks de la semana siguiente
+    # (sin resultados) no deben mover la referencia del cambio de posición
+    graded_weeks = (Pick
+                    .select(Pick.week)
+                    .where((Pick.league == league_id) &
+                           Pick.is_correct.is_null(False) &
+                           picks_in_season(Pick, season))
+                    .distinct())
+    last_week = (WeeklyScore
+                 .select(fn.MAX(WeeklyScore.week))
+                 .where((WeeklyScore.league == league_id) &
+                        (WeeklyScore.season == season) &
+                        WeeklyScore.week.in_(graded_weeks)))
+    before_last = WeeklyScore.week < last_week
+
+    totals = (WeeklyScore
+              .select(WeeklyScore.user.alias('user_id'),
+                      fn.SUM(WeeklyScore.correct).alias('correct'),
+                      fn.SUM(WeeklyScore.total).alias('total'),
+                      fn.COUNT(WeeklyScore.id).alias('weeks_played'),
+                      fn.SUM(Case(None, [(before_last, WeeklyScore.correct)], 0)).alias('prev_correct'),
+                      fn.SUM(Case(None, [(before_last, 1)], 0)).alias('prev_weeks'))
+              .join(LeagueMembership, on=((LeagueMembership.league == WeeklyScore.league) &
+                                          (LeagueMembership.user == WeeklyScore.user)))
+              .where((WeeklyScore.league == league_id) &
+                     (WeeklyScore.season == season) &
+                     (WeeklyScore.total > 0) &
+                     (LeagueMembership.is_active == True))
+              .group_by(WeeklyScore.user)
+              .alias('totals'))
+
+    season_start, season_end = season_bounds(season)
+    wins = (WinnersHistory
+            .select(WinnersHistory.user_id, fn.COUNT(WinnersHistory.id).alias('weeks_won'))
+            .where((WinnersHistory.league_id == league_id) &
+                   (WinnersHistory.declared_at >= season_start) &
+                   (WinnersHistory.declared_at < season_end))
+            .group_by(WinnersHistory.user_id)
+            .alias('wins'))
+
+    has_previous = Case(None, [(totals.c.prev_weeks > 0, 1)], 0)
+    query = (Select([totals], [
+                 totals.c.user_id, totals.c.correct, totals.c.total, totals.c.weeks_played,
+                 totals.c.prev_weeks,
+                 User.username, User.first_name, User.last_name,
+                 fn.COALESCE(wins.c.weeks_won, 0).alias('weeks_won'),
+                 fn.RANK().over(order_by=[totals.c.correct.desc()]).alias('rank'),
+                 fn.RANK().over(partition_by=[has_previous],
+                                order_by=[totals.c.prev_correct.desc()]).alias('prev_rank')])
+             .join(User, on=(User.id == totals.c.user_id))
+             .join(wins, JOIN.LEFT_OUTER, on=(wins.c.user_id == totals.c.user_id))
+             .order_by(SQL('rank'), User.id)
+             .bind(database)
+             .dicts())
+
+    leaderboard = []
+    for row in query:
+        correct_picks = row['correct']
+        total_picks = row['total']
+        prev_rank = row['prev_rank'] if row['prev_weeks'] > 0 else None
+        leaderboard.append({
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'correct_picks': correct_picks,
+            'total_picks': total_picks,
+            'percentage': (correct_picks / total_picks * 100) if total_picks > 0 else 0,
+            'weeks_played': row['weeks_played'],
+            'weeks_won': row['weeks_won'],
+            'rank': row['rank'],
+            'prev_rank': prev_rank,
+            # Positivo = subió posiciones respecto a la semana anterior
+            'rank_delta': (prev_rank - row['rank']) if prev_rank is not None else None,
+        })
+    return leaderboard
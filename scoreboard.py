@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Comandos del scoreboard de ESPN.
+Permite correr el poller como proceso aparte del servidor web:
+
+    python scoreboard.py poll
+    python scoreboard.py prefetch [--pending] [--weeks 1 2 3] [--workers 9]
+
+Con el poller aparte conviene desactivar el poller dentro de gunicorn con SCOREBOARD_POLLER=False;
+los workers leen los juegos de la tabla games.
+"""
+
+import argparse
+import os
+import sys
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from quinielasapp.services.scoreboard_poller import ScoreboardPoller
+from quinielasapp.services.scoring_service import start_result_listener
+from shared_utils import prefetch_season_games, PREFETCH_WORKERS
+
+
+def poll(args):
+    """Corre el poller en primer plano hasta Ctrl+C"""
+    poller = ScoreboardPoller()
+    try:
+        poller.run()
+    except KeyboardInterrupt:
+        print("⏹️ Poller detenido")
+
+
+def prefetch(args):
+    """Descarga en paralelo las semanas de la temporada y calienta la tabla games"""
+    import time
+
+    started = time.perf_counter()
+    summary = prefetch_season_games(weeks=args.weeks, pending_only=args.pending,
+                                    max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    for week, result in summary.items():
+        print(f"  Semana {week:>2}: {result}")
+    print(f"✅ {len(summary)} semanas precargadas en {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Herramientas del scoreboard de ESPN')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    poll_parser = subparsers.add_parser('poll', help='Sincroniza la semana actual de forma continua')
+    poll_parser.set_defaults(func=poll)
+
+    prefetch_parser = subparsers.add_parser('prefetch', help='Precarga en paralelo las semanas de la temporada')
+    prefetch_parser.add_argument('--pending', action='store_true',
+                                 help='Solo semanas con juegos que aún no son finales')
+    prefetch_parser.add_argument('--weeks', type=int, nargs='+', help='Semanas específicas')
+    prefetch_parser.add_argument('--workers', type=int, default=PREFETCH_WORKERS,
+                                 help='Descargas simultáneas')
+    prefetch_parser.set_defaults(func=prefetch)
+
+    args = parser.parse_args()
+    # Los juegos que pasan a final durante la sincronización se califican solos
+    start_result_listener()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,26 @@ Funciones que necesitan ser accesibles desde múltiples módulos
 """
 
 import hashlib
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from quinielasapp.models import pooled_connection
 from quinielasapp.services.database_service import get_current_week
+from quinielasapp.services.espn_client import espn_client
+from quinielasapp.services.game_events import diff_games, publish
+from quinielasapp.services.scoreboard_poller import poller_enabled
+from quinielasapp.services.scoreboard_cache import (
+    scoreboard_cache, scoreboard_flight, ttl_for_games, LIVE_TTL, POLL_GRACE
+)
+from quinielasapp.services.games_service import (
+    SEASON_TYPE_REGULAR, REGULAR_SEASON_WEEKS, GameRecord,
+    nfl_season, upsert_games, get_week_games, get_final_weeks
+)
+
+# Descargas simultáneas a ESPN al precargar la temporada
+PREFETCH_WORKERS = int(os.environ.get('SCOREBOARD_PREFETCH_WORKERS', '9'))
 
 
 def hash_password(password):
@@ -16,119 +33,262 @@ def hash_password(password):
 
 def get_espn_nfl_data(week=None):
     """
-    Obtiene los datos de la NFL desde la API de ESPN.
-    Mantiene la misma lógica que antes pero con mejores tipos.
+    Obtiene los juegos de una semana de la NFL.
+    Orden de lectura: caché en memoria -> tabla games -> ESPN.
+    Una semana expirada se sirve de inmediato y se refresca en segundo plano
+    (stale-while-revalidate); si ESPN falla se sigue sirviendo la última versión buena.
     """
     if week is None:
         week = get_current_week()
     
-    current_year = datetime.now().year
-    url = f"https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard?dates={current_year}&seasontype=2&week={week}"
+    season = nfl_season()
+    cache_key = (season, SEASON_TYPE_REGULAR, week)
     
-    try:
-        response = requests.get(url, verify=False, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        games = []
-        if 'events' in data:
-            for event in data['events']:
-                if len(event.get('competitions', [])) > 0:
-                    competition = event['competitions'][0]
-                    competitors = competition.get('competitors', [])
-                    
-                    if len(competitors) >= 2:
-                        # Extraer información de los equipos
-                        home_team = None
-                        away_team = None
-                        
-                        for competitor in competitors:
-                            team_info = competitor.get('team', {})
-                            team_name = team_info.get('displayName', 'Unknown')
-                            team_abbr = team_info.get('abbreviation', team_name[:3].upper())
-                            
-                            if competitor.get('homeAway') == 'home':
-                                home_team = {
-                                    'name': team_name,
-                                    'abbreviation': team_abbr,
-                                    'logo': team_info.get('logo', ''),
-                                    'score': competitor.get('score', '0')
-                                }
-                            else:
-                                away_team = {
-                                    'name': team_name,
-                                    'abbreviation': team_abbr,
-                                    'logo': team_info.get('logo', ''),
-                                    'score': competitor.get('score', '0')
-                                }
-                        
-                        # Extraer fecha y hora del juego
-                        game_date = event.get('date', '')
-                        start_time = 'TBD'
-                        if game_date:
-                            try:
-                                # Convertir fecha ISO a formato legible con zona horaria de Ciudad de México
-                                dt = datetime.fromisoformat(game_date.replace('Z', '+00:00'))
-                                
-                                # Convertir a zona horaria de Ciudad de México
-                                from zoneinfo import ZoneInfo
-                                cdmx_tz = ZoneInfo("America/Mexico_City")
-                                local_dt = dt.astimezone(cdmx_tz)
-                                
-                                # Días de la semana en español
-                                days_spanish = {
-                                    'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles',
-                                    'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-                                }
-                                
-                                day_name = days_spanish.get(local_dt.strftime('%A'), local_dt.strftime('%A'))
-                                start_time = f"{day_name} {local_dt.day}/{local_dt.month} {local_dt.strftime('%H:%M')}"
-                            except:
-                                start_time = 'TBD'
-                        
-                        # Información del juego con formato compatible con templates
-                        game_info = {
-                            'id': event.get('id', ''),
-                            'name': event.get('name', ''),
-                            'date': game_date,
-                            'start_time': start_time,
-                            'status': competition.get('status', {}).get('type', {}).get('description', 'Scheduled'),
-                            'clock': competition.get('status', {}).get('displayClock', ''),
-                            'period': competition.get('status', {}).get('period', 0),
-                            'completed': competition.get('status', {}).get('type', {}).get('completed', False),
-                            'week': week,
-                            # Datos del equipo home - Formato híbrido para compatibilidad
-                            'home_team': {
-                                'name': home_team['name'] if home_team else 'Unknown',
-                                'abbreviation': home_team['abbreviation'] if home_team else 'UNK'
-                            },
-                            'home_logo': home_team['logo'] if home_team else '',
-                            'home_score': int(home_team['score']) if home_team and home_team['score'].isdigit() else 0,
-                            # Datos del equipo away - Formato híbrido para compatibilidad
-                            'away_team': {
-                                'name': away_team['name'] if away_team else 'Unknown',
-                                'abbreviation': away_team['abbreviation'] if away_team else 'UNK'
-                            },
-                            'away_logo': away_team['logo'] if away_team else '',
-                            'away_score': int(away_team['score']) if away_team and away_team['score'].isdigit() else 0
-                        }
-                        
-                        games.append(game_info)
-        
+    # Si el poller en segundo plano está activo, la semana actual ya está en el caché
+    games, fresh = scoreboard_cache.get_stale(cache_key)
+    if games is not None:
+        if not fresh:
+            _revalidate_in_background(week, season)
         return games
+    
+    # Requests concurrentes con la misma semana esperan una sola carga
+    games, leader = scoreboard_flight.do(cache_key, lambda: _load_week_games(week, season))
+    return list(games)
+
+
+def _load_week_games(week, season):
+    """Carga una semana que no estaba en el caché (se ejecuta una vez por semana a la vez)"""
+    cache_key = (season, SEASON_TYPE_REGULAR, week)
+    
+    # Otra carga pudo terminar mientras esperábamos turno
+    games, fresh = scoreboard_cache.get_stale(cache_key, count=False)
+    if games is not None:
+        if not fresh:
+            _revalidate_in_background(week, season)
+        return games
+    
+    # La tabla games es la última versión buena conocida de cada semana;
+    # el poller (hilo o proceso aparte) la mantiene al día
+    games, last_update = get_week_games(season, week)
+    if games:
+        remaining = _remaining_ttl(games, last_update)
+        if remaining > 0:
+            scoreboard_cache.set(cache_key, games, ttl=remaining)
+        else:
+            # Servir la versión guardada ya y refrescarla sin bloquear el request
+            scoreboard_cache.set(cache_key, games, ttl=0)
+            _revalidate_in_background(week, season)
+        return games
+    
+    # Semana nunca sincronizada: no hay más remedio que esperar a ESPN
+    try:
+        return refresh_week_games(week, season)
         
     except requests.exceptions.RequestException as e:
         print(f"Error fetching NFL data: {e}")
-        return get_mock_nfl_data()
+        return []
     except Exception as e:
         print(f"Unexpected error: {e}")
-        return get_mock_nfl_data()
+        return []
+
+
+def _remaining_ttl(games, last_update):
+    """Segundos que le quedan de vigencia a una semana leída de la tabla games (<= 0 si expiró)"""
+    ttl = ttl_for_games(games) + POLL_GRACE
+    return ttl - (datetime.now() - last_update).total_seconds()
+
+
+def _reload_from_table(week, season):
+    """
+    Recarga una semana desde la tabla games si otro proceso (el poller aparte) ya la refrescó.
+    Regresa False si la fila también expiró y hay que ir a ESPN.
+    """
+    with pooled_connection():
+        games, last_update = get_week_games(season, week)
+    if not games:
+        return False
+    remaining = _remaining_ttl(games, last_update)
+    if remaining <= 0:
+        return False
+    scoreboard_cache.set((season, SEASON_TYPE_REGULAR, week), games, ttl=remaining)
+    return True
+
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _revalidate_in_background(week, season):
+    """
+    Refresca una semana en un hilo aparte (uno a la vez por semana).
+    Sin poller en este proceso la tabla games la mantiene el proceso del poller,
+    así que primero se relee de ahí y solo se llama a ESPN si también expiró.
+    """
+    cache_key = (season, SEASON_TYPE_REGULAR, week)
+    
+    with _revalidating_lock:
+        if cache_key in _revalidating:
+            return
+        _revalidating.add(cache_key)
+    
+    def revalidate():
+        try:
+            if not poller_enabled() and _reload_from_table(week, season):
+                return
+            refresh_week_games(week, season)
+        except Exception as e:
+            # Conservar la última versión buena y no reintentar en cada request
+            print(f"Error refreshing week {week} in background: {e}")
+            scoreboard_cache.touch(cache_key, LIVE_TTL)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(cache_key)
+    
+    threading.Thread(target=revalidate, name=f'scoreboard-revalidate-{week}', daemon=True).start()
+
+
+def refresh_week_games(week, season=None, grace=0):
+    """
+    Descarga una semana de ESPN, la guarda en la tabla games y en el caché.
+    Publica los eventos de cambio respecto a la versión anterior de la semana.
+    La llamada a ESPN se hace sin conexión a la base de datos; solo se toma una
+    del pool para leer la versión anterior y guardar la nueva.
+    `grace` extiende el TTL (lo usa el poller para que la entrada no expire entre ciclos).
+    Regresa los juegos; lanza la excepción si ESPN falla.
+    """
+    if season is None:
+        season = nfl_season()
+    cache_key = (season, SEASON_TYPE_REGULAR, week)
+    
+    games = fetch_espn_scoreboard(week, season)
+    
+    # Versión anterior: la del caché si existe, si no la guardada en la tabla games
+    previous, _ = scoreboard_cache.get_stale(cache_key, count=False)
+    with pooled_connection():
+        if previous is None:
+            previous, _ = get_week_games(season, week)
+        upsert_games(games, season)
+    events = diff_games(previous, games)
+    
+    scoreboard_cache.set(cache_key, games, ttl=ttl_for_games(games) + grace)
+    publish(events)
+    return games
+
+
+def prefetch_season_games(weeks=None, pending_only=False, max_workers=PREFETCH_WORKERS, season=None):
+    """
+    Descarga en paralelo varias semanas de la temporada y calienta la tabla games y el caché.
+    - weeks: semanas a descargar (por defecto las 18 de temporada regular)
+    - pending_only: omite las semanas en las que todos los juegos ya son finales
+    Regresa un dict {semana: número de juegos o mensaje de error}.
+    """
+    if season is None:
+        season = nfl_season()
+    if weeks is None:
+        weeks = range(1, REGULAR_SEASON_WEEKS + 1)
+    weeks = sorted(set(weeks))
+    
+    if pending_only:
+        with pooled_connection():
+            final_weeks = get_final_weeks(season)
+        weeks = [week for week in weeks if week not in final_weeks]
+    
+    def prefetch_week(week):
+        # Cada hilo toma una conexión solo para guardar su semana, no durante la descarga
+        return len(refresh_week_games(week, season))
+    
+    summary = {}
+    if not weeks:
+        return summary
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scoreboard-prefetch') as executor:
+        futures = {executor.submit(prefetch_week, week): week for week in weeks}
+        for future in as_completed(futures):
+            week = futures[future]
+            try:
+                summary[week] = future.result()
+            except Exception as e:
+                print(f"Error prefetching week {week}: {e}")
+                summary[week] = f"error: {e}"
+    
+    return dict(sorted(summary.items()))
+
+
+def start_season_prefetch():
+    """Hook de arranque: precarga en segundo plano las semanas con juegos pendientes"""
+    if os.environ.get('SCOREBOARD_PREFETCH', 'True').lower() != 'true':
+        return None
+    
+    def prefetch():
+        try:
+            summary = prefetch_season_games(pending_only=True)
+            print(f"✅ Precarga de temporada completada: {len(summary)} semanas")
+        except Exception as e:
+            print(f"Error prefetching season: {e}")
+    
+    thread = threading.Thread(target=prefetch, name='scoreboard-prefetch', daemon=True)
+    thread.start()
+    return thread
+
+
+def fetch_espn_scoreboard(week, season, seasontype=SEASON_TYPE_REGULAR):
+    """
+    Descarga y parsea el scoreboard de ESPN para una semana.
+    El cliente reintenta y, con el breaker abierto, sirve la última respuesta buena;
+    si no hay ninguna, lanza la excepción de requests.
+    """
+    data = espn_client.get_scoreboard(season, seasontype, week)
+    
+    games = []
+    for event in data.get('events', []):
+        competitions = event.get('competitions', [])
+        if not competitions:
+            continue
+        competition = competitions[0]
+        competitors = competition.get('competitors', [])
+        if len(competitors) < 2:
+            continue
+        
+        # Extraer información de los equipos
+        teams = {}
+        for competitor in competitors:
+            team_info = competitor.get('team', {})
+            team_name = team_info.get('displayName', 'Unknown')
+            score = competitor.get('score', '0')
+            side = 'home' if competitor.get('homeAway') == 'home' else 'away'
+            teams[side] = (
+                team_name,
+                team_info.get('abbreviation', team_name[:3].upper()),
+                team_info.get('logo', ''),
+                int(score) if isinstance(score, str) and score.isdigit() else 0
+            )
+        home = teams.get('home', ('Unknown', 'UNK', '', 0))
+        away = teams.get('away', ('Unknown', 'UNK', '', 0))
+        
+        status = competition.get('status', {})
+        status_type = status.get('type', {})
+        
+        # El registro calcula una sola vez la hora de inicio en Ciudad de México
+        games.append(GameRecord.create(
+            id=event.get('id', ''),
+            name=event.get('name', ''),
+            date=event.get('date', ''),
+            status=status_type.get('description', 'Scheduled'),
+            clock=status.get('displayClock', ''),
+            period=status.get('period', 0),
+            completed=status_type.get('completed', False),
+            week=week,
+            home_name=home[0], home_abbr=home[1], home_logo=home[2], home_score=home[3],
+            away_name=away[0], away_abbr=away[1], away_logo=away[2], away_score=away[3],
+        ))
+    
+    return games
 
 
 def get_mock_nfl_data():
     """
-    Datos de prueba para cuando la API de ESPN no esté disponible.
-    Con formato compatible con templates.
+    Datos de prueba con formato compatible con templates.
+    Solo para depuración (/admin/debug_api); ya no se usan como respaldo de ESPN.
     """
     return [
         {
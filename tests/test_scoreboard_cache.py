@@ -0,0 +1,88 @@
+"""
+Coalescencia de cargas del scoreboard: N requests concurrentes por la misma
+semana deben disparar una sola descarga a ESPN y recibir los mismos juegos.
+"""
+
+import os
+import sys
+import contextlib
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_utils
+from quinielasapp.services.games_service import GameRecord, SEASON_TYPE_REGULAR
+from quinielasapp.services.scoreboard_cache import SingleFlight, scoreboard_cache
+
+CALLERS = 16
+
+
+def run_concurrently(target):
+    """Arranca CALLERS hilos a la vez y regresa sus resultados"""
+    barrier = threading.Barrier(CALLERS)
+    results = [None] * CALLERS
+
+    def call(i):
+        barrier.wait()
+        results[i] = target()
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def sample_games(week):
+    return [GameRecord.create(
+        id='401', name='Buffalo Bills at Kansas City Chiefs', date='2025-09-07T20:20Z',
+        status='Scheduled', clock='0:00', period=0, completed=False, week=week,
+        home_name='Kansas City Chiefs', home_abbr='KC', home_logo='', home_score=0,
+        away_name='Buffalo Bills', away_abbr='BUF', away_logo='', away_score=0,
+    )]
+
+
+def test_single_flight_runs_load_once():
+    flight = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return ['game']
+
+    results = run_concurrently(lambda: flight.do('week-1', load))
+
+    assert len(calls) == 1
+    assert sum(1 for _, leader in results if leader) == 1
+    shared = results[0][0]
+    assert all(result is shared for result, _ in results)
+
+
+def test_get_espn_nfl_data_fetches_once(monkeypatch):
+    week = 7
+    season = shared_utils.nfl_season()
+    scoreboard_cache.invalidate((season, SEASON_TYPE_REGULAR, week))
+    calls = []
+
+    def fake_fetch(fetch_week, fetch_season, *args, **kwargs):
+        calls.append(fetch_week)
+        time.sleep(0.2)
+        return sample_games(fetch_week)
+
+    # Sin base de datos: semana nunca sincronizada y escritura sin efecto
+    monkeypatch.setattr(shared_utils, 'fetch_espn_scoreboard', fake_fetch)
+    monkeypatch.setattr(shared_utils, 'get_week_games', lambda season, week: ([], None))
+    monkeypatch.setattr(shared_utils, 'upsert_games', lambda games, season: None)
+    monkeypatch.setattr(shared_utils, 'pooled_connection', contextlib.nullcontext)
+
+    try:
+        results = run_concurrently(lambda: shared_utils.get_espn_nfl_data(week))
+    finally:
+        scoreboard_cache.invalidate((season, SEASON_TYPE_REGULAR, week))
+
+    assert calls == [week]
+    assert all(games == results[0] for games in results)
+    assert [game['id'] for game in results[0]] == ['401']